@@ -0,0 +1,72 @@
+"""
+Measures the cold start of the cli: every timer tick starts a fresh interpreter, so import time is paid on each run.
+Runs `python -X importtime -c "import dyndns"` a few times, prints the slowest imports and fails (exit code 1) if the
+startup budget is exceeded or a module which should only be loaded on demand shows up.
+
+    python -m benchmarks.bench_import --runs 5 --budget 0.5
+"""
+
+import os
+import subprocess
+import sys
+
+import click
+
+# loaded on first use only (table output, FRITZ!Box lookups, metrics server in daemon mode, --profile)
+LAZY = ("tabulate", "fritzconnection", "http.server", "cProfile", "sqlite3")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(module: str) -> dict:
+    """
+    Import the module in a fresh interpreter.
+    :param module: module name
+    :return: cumulative import time in seconds per imported module
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+@click.command()
+@click.option("--module", "-m", default="dyndns", help="module to import, defaults to dyndns.")
+@click.option("--runs", "-r", type=int, default=5, help="number of cold starts, the fastest one is reported.")
+@click.option("--budget", "-b", type=float, default=0.5, help="seconds the import may take at most.")
+@click.option("--top", "-t", type=int, default=15, help="number of slowest imports to list.")
+def main(module: str, runs: int, budget: float, top: int):
+    """
+    Print the slowest imports and check the startup budget.
+    """
+    from tabulate import tabulate
+
+    # the fastest run is the least disturbed by the rest of the system
+    times = min((import_times(module) for _ in range(runs)), key=lambda t: t.get(module, 0.0))
+    total = times[module]
+
+    rows = sorted(((name, f"{seconds:.4f}") for name, seconds in times.items() if "." not in name),
+                  key=lambda row: float(row[1]), reverse=True)[:top]
+    print(tabulate(rows, tablefmt="orgtbl", headers=["top level import", "cumulative [s]"]))
+    print(f"\nimport {module}: {total:.4f}s (budget {budget:.4f}s)")
+
+    failed = False
+    eager = [name for name in times if name.split(".")[0] in LAZY or name in LAZY]
+    if eager:
+        print(f"imported eagerly, should be lazy: {', '.join(sorted(eager))}")
+        failed = True
+    if total > budget:
+        print("startup budget exceeded")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compares memory and build time of DNSRecord and CompactDNSRecord record sets for synthetic zones (see fake_netcup.py).
+The infoDnsRecords response is decoded from json like in a real run, so the strings belong to the records.
+
+    python -m benchmarks.bench_memory --sizes 1000,100000 --shared 0.5
+"""
+
+import gc
+import json
+import time
+import tracemalloc
+
+import click
+
+from nc_api import CompactDNSRecord, DNSRecord
+from nc_api.nc_api import NcAPIBase
+from benchmarks.fake_netcup import make_records
+
+IP = "192.0.2.1"
+
+
+def make_response(size: int, shared: float) -> bytes:
+    """
+    Encoded infoDnsRecords responsedata.
+    :param size: number of records
+    :param shared: fraction of A records pointing to the same (external) ip
+    :return: json bytes
+    """
+    records = make_records(size)
+    step = max(1, round(1 / shared)) if shared else 0
+    for i, r in enumerate(r for r in records if r["type"] == "A"):
+        if step and not i % step:
+            r["destination"] = IP
+    return json.dumps({"dnsrecords": records}).encode()
+
+
+def measure(response: bytes, record_class) -> tuple:
+    """
+    Decode the response and build a record set from it.
+    :param response: encoded responsedata of infoDnsRecords
+    :param record_class: DNSRecord or CompactDNSRecord
+    :return: (bytes kept by the record set, seconds to build it)
+    """
+    gc.collect()
+    tracemalloc.start()
+    responsedata = json.loads(response)
+    start = time.perf_counter()
+    rset = NcAPIBase.build_recordset(responsedata=responsedata, record_class=record_class)
+    wall = time.perf_counter() - start
+    del responsedata
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rset
+    return size, wall
+
+
+@click.command()
+@click.option("--sizes", "-s", default="1000,10000,100000", help="comma separated zone sizes.")
+@click.option("--shared", type=float, default=0.5, help="fraction of A records pointing to the external ip.")
+def main(sizes: str, shared: float):
+    """
+    Print memory per record and build time for both record classes.
+    """
+    from tabulate import tabulate
+
+    rows = []
+    for size in (int(s) for s in sizes.split(",")):
+        response = make_response(size, shared)
+        for record_class in (DNSRecord, CompactDNSRecord):
+            memory, wall = measure(response, record_class)
+            rows.append([record_class.__name__, size, f"{memory / 2 ** 20:.2f}", f"{memory / size:.0f}",
+                         f"{wall:.4f}"])
+
+    print(tabulate(rows, tablefmt="orgtbl", headers=["record class", "records", "memory [MiB]", "bytes/record",
+                                                     "build [s]"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Measures how hosts import, record lookups, diffing, table rendering, payload building and a full sync against the
+local netcup stand-in (see fake_netcup.py) scale with the zone size.
+
+    python -m benchmarks.bench_reconcile --sizes 10,1000,100000 --latency 0.02
+"""
+
+import json
+import os
+import tempfile
+import time
+from ipaddress import IPv4Address
+
+import click
+from tabulate import tabulate
+
+from dyndns import build_recordset, sync_zone
+from nc_api import NcAPI
+from nc_api.utils.config import load_hosts
+from benchmarks.fake_netcup import FakeNetcup, serve
+
+DOMAIN = "example.com"
+IP = IPv4Address("192.0.2.1")
+
+
+class Result:
+    """
+    Wall time of one scenario plus request and byte counters of the fake api.
+    """
+
+    def __init__(self, scenario: str, size: int):
+        self.scenario = scenario
+        self.size = size
+        self.wall = 0.0
+        self.requests = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def row(self) -> list:
+        return [self.scenario, self.size, f"{self.wall:.4f}", self.requests, self.bytes_sent, self.bytes_received]
+
+
+class measure:
+    """
+    Contextmanager filling a Result with the wall time and the fake api counters of its block.
+    """
+
+    def __init__(self, results: list, scenario: str, size: int, api: FakeNetcup = None):
+        self.result = Result(scenario, size)
+        self.api = api
+        results.append(self.result)
+
+    def __enter__(self) -> Result:
+        if self.api is not None:
+            self.api.reset_counters()
+        self._start = time.perf_counter()
+        return self.result
+
+    def __exit__(self, *args):
+        self.result.wall = time.perf_counter() - self._start
+        if self.api is not None:
+            self.result.requests = self.api.requests
+            self.result.bytes_sent = self.api.bytes_in
+            self.result.bytes_received = self.api.bytes_out
+
+
+def write_hosts(directory: str, api: FakeNetcup, changed: float) -> str:
+    """
+    Hosts file covering every 10th record of the fake zone, a fraction of them points to the dyndns ip.
+    :param directory: where to put the file
+    :param api: the fake api holding the zone
+    :param changed: fraction of hosts which need an update
+    :return: file name
+    """
+    hosts = []
+    records = [r for r in api.zones[DOMAIN]["records"] if r["type"] == "A"][::2]
+    step = max(1, round(1 / changed)) if changed else 0
+    for i, r in enumerate(records):
+        host = {"hostname": r["hostname"], "type": "A"}
+        if not step or i % step:
+            host["destination"] = r["destination"]
+        hosts.append(host)
+
+    filename = os.path.join(directory, "hosts.json")
+    with open(filename, "w") as fp:
+        json.dump({"zone": {"domainname": DOMAIN}, "hosts": hosts}, fp)
+    return filename
+
+
+def run_size(size: int, latency: float, changed: float, with_table: bool) -> list:
+    """
+    Run all scenarios for one zone size.
+    :return: list of Result
+    """
+    results = []
+    fake = FakeNetcup(latency=latency)
+    fake.add_zone(DOMAIN, size)
+    server = serve(fake)
+    url = f"http://{server.server_address[0]}:{server.server_address[1]}/"
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            hosts_file = write_hosts(directory, fake, changed)
+
+            with measure(results, "import hosts", size):
+                zone, = load_hosts(hosts_file).zones
+                desired = build_recordset(hosts=zone.hosts, ip=IP)
+
+            api = NcAPI(api_url=url, api_password="secret", api_key="key", customer_id="1")
+            with measure(results, "infoDnsRecords", size, fake):
+                with api:
+                    live = api.infoDnsRecords(domainname=DOMAIN)
+
+            with measure(results, "lookups (hostname, type)", size):
+                for r in live:
+                    live.get_by_hostname(r.hostname)
+                    (r.hostname, r.type) in live
+
+            with measure(results, "diff", size):
+                diff = live.diff(desired)
+
+            if with_table:
+                with measure(results, "table()", size):
+                    live.table()
+
+            with measure(results, "build payload (full set)", size) as result:
+                payload = api.nc_request(action="updateDnsRecords",
+                                         parameters={"domainname": DOMAIN, "dnsrecordset": live.json()})
+                result.bytes_sent = len(json.dumps(payload))
+
+            with measure(results, "build payload (changes)", size) as result:
+                payload = api.nc_request(action="updateDnsRecords",
+                                         parameters={"domainname": DOMAIN, "dnsrecordset": diff.changes().json()})
+                result.bytes_sent = len(json.dumps(payload))
+
+            with measure(results, "sync zone (update)", size, fake):
+                with NcAPI(api_url=url, api_password="secret", api_key="key", customer_id="1") as api:
+                    sync_zone(api=api, domainname=DOMAIN, new_set=desired, update=True)
+    finally:
+        server.shutdown()
+
+    return results
+
+
+@click.command()
+@click.option("--sizes", "-s", default="10,100,1000,10000,100000", help="comma separated zone sizes.")
+@click.option("--latency", "-l", type=float, default=0.0, help="seconds the fake api adds to every request.")
+@click.option("--changed", "-c", type=float, default=0.01, help="fraction of hosts needing an update.")
+@click.option("--no-table", help="skip the table() scenario (slow for big zones).", is_flag=True)
+def main(sizes: str, latency: float, changed: float, no_table: bool):
+    """
+    Print wall time, requests and payload bytes per scenario and zone size.
+    """
+    rows = []
+    for size in (int(s) for s in sizes.split(",")):
+        rows += [r.row() for r in run_size(size=size, latency=latency, changed=changed, with_table=not no_table)]
+
+    print(tabulate(rows, tablefmt="orgtbl", headers=["scenario", "records", "wall [s]", "requests", "bytes sent",
+                                                     "bytes received"]))
+
+
+if __name__ == "__main__":
+    main()
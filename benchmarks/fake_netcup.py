@@ -0,0 +1,200 @@
+"""
+Local stand-in for the netcup json api (login, logout, infoDnsZone, infoDnsRecords, updateDnsZone, updateDnsRecords).
+It keeps the zones in memory, can add latency to every request and counts requests and payload bytes.
+
+Run it standalone with python -m benchmarks.fake_netcup, then point API_URL at http://127.0.0.1:<port>/.
+"""
+
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import click
+
+
+def make_records(size: int) -> list:
+    """
+    Synthetic zone content, a mix of A, AAAA, CNAME, MX and TXT records.
+    :param size: number of records
+    :return: list of record dictionaries as returned by infoDnsRecords
+    """
+    records = []
+    for i in range(size):
+        kind = i % 10
+        if kind < 5:
+            rtype, destination = "A", f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+        elif kind < 7:
+            rtype, destination = "AAAA", f"fd00::{i:x}"
+        elif kind < 9:
+            rtype, destination = "CNAME", f"host{i - 1}.example.com"
+        else:
+            rtype, destination = "MX", f"mx{i}.example.com"
+        records.append({"id": str(i + 1), "hostname": f"host{i}", "type": rtype, "priority": "10" if rtype == "MX" else "0",
+                        "destination": destination, "deleterecord": False, "state": "yes"})
+    return records
+
+
+class FakeNetcup:
+    """
+    In memory netcup api.
+    """
+
+    def __init__(self, latency: float = 0.0, api_password: str = None):
+        """
+        :param latency: seconds added to every request
+        :param api_password: if given, logins with another password fail
+        """
+        self.latency = latency
+        self.api_password = api_password
+        self.zones = {}
+        self.sessions = set()
+        self.requests = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._lock = threading.Lock()
+        self._next_id = 1 << 30
+
+    def add_zone(self, domainname: str, size: int):
+        """
+        Create a zone with size synthetic records.
+        :param domainname: domain name like example.com
+        :param size: number of records
+        :return: None
+        """
+        self.zones[domainname] = {"zone": {"name": domainname, "ttl": "86400", "serial": "2020010100", "refresh": "28800",
+                                           "retry": "7200", "expire": "1209600", "dnssecstatus": False},
+                                  "records": make_records(size)}
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = self.bytes_in = self.bytes_out = 0
+
+    @staticmethod
+    def _result(action: str, data="", status: str = "success", statuscode: int = 2000, message: str = "") -> dict:
+        return {"serverrequestid": uuid.uuid4().hex, "clientrequestid": "", "action": action, "status": status,
+                "statuscode": statuscode, "shortmessage": message, "longmessage": message, "responsedata": data}
+
+    def _bump_serial(self, zone: dict):
+        zone["zone"]["serial"] = str(int(zone["zone"]["serial"]) + 1)
+
+    def handle(self, body: bytes) -> bytes:
+        """
+        Process one request body and return the response body.
+        :param body: json request
+        :return: json response
+        """
+        if self.latency:
+            time.sleep(self.latency)
+
+        request = json.loads(body)
+        action, param = request["action"], request["param"]
+
+        with self._lock:
+            if action == "login" and self.api_password not in (None, param.get("apipassword")):
+                result = self._result(action, status="error", statuscode=4013, message="The login failed.")
+            elif action == "login":
+                session_id = uuid.uuid4().hex
+                self.sessions.add(session_id)
+                result = self._result(action, {"apisessionid": session_id})
+            elif param.get("apisessionid") not in self.sessions:
+                result = self._result(action, status="error", statuscode=4001, message="The session id is invalid.")
+            elif action == "logout":
+                self.sessions.discard(param["apisessionid"])
+                result = self._result(action)
+            elif param.get("domainname") not in self.zones:
+                result = self._result(action, status="error", statuscode=5029, message="Domain not found.")
+            else:
+                zone = self.zones[param["domainname"]]
+                result = getattr(self, f"_{action}")(zone, param)
+
+        response = json.dumps(result).encode()
+        with self._lock:
+            self.requests += 1
+            self.bytes_in += len(body)
+            self.bytes_out += len(response)
+        return response
+
+    def _infoDnsZone(self, zone: dict, param: dict) -> dict:
+        return self._result("infoDnsZone", zone["zone"])
+
+    def _infoDnsRecords(self, zone: dict, param: dict) -> dict:
+        return self._result("infoDnsRecords", {"dnsrecords": zone["records"]})
+
+    def _updateDnsZone(self, zone: dict, param: dict) -> dict:
+        zone["zone"].update({k: str(v) for k, v in param["dnszone"].items() if k in ("ttl", "refresh", "retry", "expire")})
+        self._bump_serial(zone)
+        return self._result("updateDnsZone", zone["zone"])
+
+    def _updateDnsRecords(self, zone: dict, param: dict) -> dict:
+        by_id = {r["id"]: r for r in zone["records"]}
+        for r in param["dnsrecordset"]["dnsrecords"]:
+            if r.get("id") is None:
+                self._next_id += 1
+                zone["records"].append({"id": str(self._next_id), "hostname": r["hostname"], "type": r["type"],
+                                        "priority": str(r.get("priority") or 0), "destination": r["destination"],
+                                        "deleterecord": False, "state": "yes"})
+            elif r.get("deleterecord"):
+                by_id.pop(str(r["id"]), None)
+                zone["records"] = [x for x in zone["records"] if x["id"] != str(r["id"])]
+            elif str(r["id"]) in by_id:
+                by_id[str(r["id"])].update(hostname=r["hostname"], type=r["type"], destination=r["destination"],
+                                          priority=str(r.get("priority") or 0))
+        self._bump_serial(zone)
+        return self._result("updateDnsRecords", {"dnsrecords": zone["records"]})
+
+
+def serve(api: FakeNetcup, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """
+    Serve the fake api in a background thread.
+    :param api: FakeNetcup instance
+    :param host: address to bind to
+    :param port: port to bind to, 0 picks a free one
+    :return: the running server, see server.server_address and server.shutdown()
+    """
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            response = api.handle(body)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@click.command()
+@click.option("--port", "-p", type=int, default=8080, help="port to listen on, defaults to 8080.")
+@click.option("--latency", "-l", type=float, default=0.0, help="seconds added to every request.")
+@click.option("--zone", "-z", "zones", multiple=True, default=["example.com:100"],
+              help="domain and number of records, e.g. example.com:1000 (repeatable).")
+def main(port: int, latency: float, zones):
+    """
+    Run the fake netcup api until interrupted.
+    """
+    api = FakeNetcup(latency=latency)
+    for z in zones:
+        domainname, size = z.split(":")
+        api.add_zone(domainname, int(size))
+    server = serve(api, port=port)
+    print(f"fake netcup api listening on http://{server.server_address[0]}:{server.server_address[1]}/")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
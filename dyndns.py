@@ -4,88 +4,999 @@ An example for this list can be found in hosts.json.sample.
 The settings in settings.json have to be given to access the api (again there is an example file).
 
 The syntax for the hosts file is quite straight forward, just use the attribute names of the DNSRecord dataclass
-as keywords to construct a list of hosts.
-'hostname' and 'type' have to be provided, if no 'destination' is given, the current ip will be used.
-All other arguments are optional (default priority is 0).
+as keywords to construct a list of hosts. The file is validated before anything is sent (see nc_api.utils.config).
+Several domains can be managed with one file by giving a list of 'zones', each with a 'domainname' and 'hosts'.
+'hostname' and 'type' have to be provided, if no 'destination' is given, the current ip will be used
+(the ipv6 address for AAAA records, the ipv4 address otherwise).
+All other arguments are optional (default priority is 0), a host with 'deleterecord' set removes its record.
 
-This script will not check the sanity of your entries!
+'dyndns apply' takes the same format as the complete desired state of the zones: records missing in the file are
+deleted and priorities are compared as well.
 """
 
 import json
 import logging
-from ipaddress import IPv4Address
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from ipaddress import IPv4Address, IPv6Address
+from typing import List
 
 import click
 
-from nc_api import NcAPI, DNSRecord, DNSRecordSet
-from nc_api.utils.external_ip import ExternalIpify, ExternalFritzbox
+from nc_api import NcAPI, DNSRecord, CompactDNSRecord, DNSRecordSet, DNSZone, RecordSetDiff
+from nc_api.dns import diff_records
+from nc_api.exceptions import AddressUnknown, PlanOutdated
+from nc_api.utils.config import ConfigError, Host, HostsConfig, decode_json, load_hosts, parse_hosts
+from nc_api.utils.external_ip import ExternalIP, ExternalIpify, ExternalFritzbox, ExternalHTTP, ExternalInterface, \
+    ExternalRace, Addresses, find_addresses
+from nc_api.utils.netlink import NetlinkWatcher
+from nc_api.utils.journal import Journal
+from nc_api.utils.http import DEFAULT_TIMEOUT, Deadline, TimeoutSession
+from nc_api.utils.metrics import LAST_PUBLISH, RECORDS_CHANGED, start_http_server, write_textfile
+from nc_api.utils.session_cache import SessionCache
+from nc_api.utils.timing import Timings
+from nc_api.utils.state import PublishState
+from nc_api.utils.zone_cache import ZoneCache
 
 
-def import_hosts(filename: str, ip: IPv4Address) -> DNSRecordSet:
+# disabled instance, used when no timings are requested
+NO_TIMINGS = Timings()
+
+OUTPUTS = ("table", "json", "none")
+
+# format version of plan files, see write_plan
+PLAN_VERSION = 1
+
+
+def echo_json(**record):
     """
-    Imports a list of hosts from the given file.
-    :param filename: where the hosts file is located
+    Print a record as a single compact json line.
+    :param record: fields of the record
+    :return: None
+    """
+    print(json.dumps(record, separators=(",", ":")))
+
+
+def build_recordset(hosts: List[Host], ip: IPv4Address, ip6: IPv6Address = None,
+                    strict: bool = False) -> DNSRecordSet:
+    """
+    Constructs the records from the parsed 'hosts' section of the hosts file.
+    :param hosts: list of Host, see nc_api.utils.config.load_hosts
     :param ip: IPv4Address instance containing target ip (for dyndns)
+    :param ip6: IPv6Address instance containing target ip for AAAA records
+    :param strict: raise instead of skipping hosts without address, required if the records are the complete zone
     :return: DNSRecordSet
+    :raises AddressUnknown: in strict mode, if a host needs an address of a family which was not found
     """
-    # read file ('host' section contains a list)
-    with open(filename) as fp:
-        hosts = json.load(fp)["hosts"]
-
     records = DNSRecordSet(dnsrecords=[])
     # construct records from hosts
     for h in hosts:
-        # check if destination is given, else use ip argument
-        destination = h["destination"] if "destination" in h else str(ip)
-        records.add(DNSRecord(hostname=h["hostname"],
-                              type=h["type"],
-                              destination=destination))
+        # check if destination is given, else use the ip argument of the matching family
+        if h.destination is not None:
+            destination = h.destination
+        else:
+            address = ip6 if h.type == "AAAA" else ip
+            if address is None:
+                if strict:
+                    # a skipped host would turn into a deletion of its live record
+                    raise AddressUnknown(f"no external ipv{6 if h.type == 'AAAA' else 4} address for {h.type} record "
+                                         f"{h.hostname}")
+                logging.warning(f"no external ip for {h.type} record {h.hostname}, skipping it")
+                continue
+            destination = str(address)
+        records.add(DNSRecord(hostname=h.hostname,
+                              type=h.type,
+                              destination=destination,
+                              priority=h.priority,
+                              deleterecord=h.deleterecord))
 
     return records
 
 
-def import_zone(filename: str) -> str:
+def http_timeout(settings: dict):
+    """
+    HTTP_TIMEOUT from settings, either seconds or [connect, read] seconds.
+    :param settings: settings dictionary
+    :return: timeout as accepted by requests
+    """
+    timeout = settings.get("HTTP_TIMEOUT", DEFAULT_TIMEOUT)
+    return tuple(timeout) if isinstance(timeout, list) else timeout
+
+
+def make_session(settings: dict, jobs: int = 4) -> TimeoutSession:
+    """
+    Pooled http session shared by the ip lookup and the api client.
+    :param settings: settings dictionary
+    :param jobs: number of zones processed in parallel
+    :return: TimeoutSession
+    """
+    return TimeoutSession(timeout=http_timeout(settings), pool_maxsize=max(10, jobs))
+
+
+def source_names(settings: dict, version: int = 4) -> list:
+    """
+    Configured sources of the external ip, see make_resolver.
+    :param settings: settings dictionary
+    :param version: 4 or 6
+    :return: list of source names, empty if this family is not looked up
+    """
+    if version == 6:
+        return settings.get("IP6_SOURCES", [])
+    names = settings.get("IP_SOURCES")
+    if names is None:
+        names = ["fritzbox"] if settings.get("FRITZBOX_IP") is not None else ["ipify"]
+    return names
+
+
+def check_sources(config: HostsConfig, settings: dict, source: str):
+    """
+    Make sure every host without destination has an address source configured for its family.
+    :param config: the hosts (or zone) file
+    :param settings: settings dictionary
+    :param source: file name used in error messages
+    :return: None
+    :raises ConfigError: for the first host whose address can not be looked up
+    """
+    for z in config.zones:
+        for h in z.hosts:
+            if h.destination is None:
+                version = 6 if h.type == "AAAA" else 4
+                if not source_names(settings, version=version):
+                    raise ConfigError(f"{source}: {z.domainname}: {h.type} record {h.hostname} has no destination, "
+                                      f"but no ipv{version} source is configured "
+                                      f"({'IP6_SOURCES' if version == 6 else 'IP_SOURCES'} in the settings)")
+
+
+def make_resolver(settings: dict, version: int = 4, session: TimeoutSession = None) -> ExternalIP:
+    """
+    Choose how to find the external ip of given family.
+    IP_SOURCES (ipv4) and IP6_SOURCES (ipv6) are lists of "fritzbox" (uses FRITZBOX_IP), "ipify",
+    "interface:<name>" (address of a local interface) or urls of services answering with the plain ip.
+    Those are asked at the same time (see ExternalRace), IP_DEADLINE and IP_QUORUM tune this.
+    Without IP_SOURCES the FRITZ!Box is used if FRITZBOX_IP is set, otherwise ipify.
+    Without IP6_SOURCES no ipv6 address is looked up.
+    :param settings: settings dictionary
+    :param version: 4 or 6
+    :param session: optional shared http session
+    :return: ExternalIP or None if this family is not used
+    """
+    timeout = http_timeout(settings)
+    fritzbox_ip = settings.get("FRITZBOX_IP")
+    sources = []
+    for name in source_names(settings, version=version):
+        if name == "fritzbox":
+            sources.append(ExternalFritzbox(fritzbox_ip, version=version,
+                                            timeout=timeout[1] if isinstance(timeout, tuple) else timeout))
+        elif name == "ipify":
+            sources.append(ExternalIpify(version=version, session=session, timeout=timeout))
+        elif name.startswith("interface:"):
+            sources.append(ExternalInterface(name.split(":", 1)[1], version=version))
+        else:
+            sources.append(ExternalHTTP(name, version=version, session=session, timeout=timeout))
+    logging.debug(f"getting external ipv{version} via {sources}")
+
+    if not sources:
+        return None
+    if len(sources) == 1:
+        return sources[0]
+    return ExternalRace(sources, deadline=settings.get("IP_DEADLINE", 10.0), quorum=settings.get("IP_QUORUM", 1))
+
+
+def get_addresses(resolvers: tuple) -> Addresses:
+    """
+    Look up the external ipv4 and ipv6 address in parallel.
+    A family which was not found is None, so the records of the other one are still updated (sync skips hosts
+    without address, apply leaves their zones alone, see build_recordset).
+    :param resolvers: (ipv4, ipv6) resolvers, see make_resolver
+    :return: Addresses or None if no configured family was found
+    """
+    ip = find_addresses(*resolvers)
+    configured = [(resolver, address) for resolver, address in zip(resolvers, ip) if resolver is not None]
+    for resolver, address in configured:
+        if address is None:
+            logging.error(f"unable to find external ipv{resolver.version}")
+    if configured and all(address is None for _, address in configured):
+        return None
+    return ip
+
+
+def make_api(settings: dict, session: TimeoutSession = None, zone_cache: ZoneCache = None) -> NcAPI:
+    """
+    Construct the api client from settings.
+    If SESSION_CACHE is given in the settings, the api session is kept in this file between runs.
+    API_RETRIES and API_BACKOFF (seconds) configure retries of failed requests.
+    COMPACT_RECORDS reads the records as CompactDNSRecord (less memory for big zones).
+    :param settings: settings dictionary
+    :param session: optional requests session to reuse
+    :param zone_cache: optional cache for dns records
+    :return: NcAPI (not logged in yet, use it as contextmanager)
+    """
+    session_cache = settings.get("SESSION_CACHE")
+    return NcAPI(api_url=settings["API_URL"],
+                 api_key=settings["API_KEY"],
+                 api_password=settings["API_PASSWORD"],
+                 customer_id=settings["CUSTOMER_ID"],
+                 session=session,
+                 zone_cache=zone_cache,
+                 session_cache=SessionCache(session_cache) if session_cache is not None else None,
+                 retries=settings.get("API_RETRIES", 3),
+                 backoff=settings.get("API_BACKOFF", 0.5),
+                 timeout=http_timeout(settings),
+                 record_class=CompactDNSRecord if settings.get("COMPACT_RECORDS") else DNSRecord)
+
+
+def sync_zone(api: NcAPI, domainname: str, new_set: DNSRecordSet, update: bool, ttl: int = None,
+              timings: Timings = NO_TIMINGS, output: str = "table", journal: Journal = None) -> str:
+    """
+    Read zone and records and update them if requested.
+    The output is collected and returned instead of printed, so zones synced in parallel do not mix their output.
+    Tables (and the records read again after an update to show them) are only built for the table output.
+    :param api: logged in NcAPI
+    :param domainname: domain name like example.com
+    :param new_set: DNSRecordSet built from the hosts file
+    :param update: push changed records
+    :param ttl: new ttl or None to leave it alone
+    :param timings: records the wall time of every step
+    :param output: one of OUTPUTS
+    :param journal: optional Journal the published changes are appended to
+    :return: report to print (empty for output none)
+    """
+    tables = output == "table"
+    out = [f"working on domain:\t{domainname}"]
+
+    # read current dns zone
+    with timings.phase("infoDnsZone", zone=domainname):
+        zone = api.infoDnsZone(domainname=domainname)
+    if tables:
+        out.append(zone.table())
+
+    # read current host records (from zone cache if the serial did not move)
+    if tables:
+        with timings.phase("infoDnsRecords", zone=domainname):
+            old_set = api.infoDnsRecords(domainname=domainname, serial=zone.serial)
+        out.append(old_set.table())
+
+        # compare with the hosts file
+        with timings.phase("diff", zone=domainname):
+            diff = old_set.diff(new_set)
+    else:
+        # no table of the records, compare them while they are received
+        with timings.phase("infoDnsRecords+diff", zone=domainname):
+            diff = diff_records(live=api.iterDnsRecords(domainname=domainname, serial=zone.serial), desired=new_set)
+
+    if tables:
+        out.append("\nchanges:")
+        out.append(diff.table())
+
+    ttl_changed = ttl is not None and zone.ttl != ttl
+    if ttl is not None:
+        out.append("updating ttl ...")
+        if not ttl_changed:
+            out.append("ttl has not changed, leaving it alone!")
+        else:
+            zone.ttl = ttl
+            with timings.phase("updateDnsZone", zone=domainname):
+                api.updateDnsZone(zone=zone)
+
+            # read zone again
+            if tables:
+                out.append(api.infoDnsZone(domainname=domainname).table())
+
+    if update:
+        out.append("\n updating records ...")
+        if diff.changed:
+            # only send the changed records
+            publish(api=api, zone=zone, diff=diff, timings=timings, journal=journal)
+
+            # read current host records
+            if tables:
+                out.append(api.infoDnsRecords(domainname=domainname).table())
+        else:
+            out.append("records did not change, leaving it alone!")
+
+    if output == "json":
+        return json.dumps({"zone": domainname, "serial": zone.serial, "ttl": zone.ttl, "ttl_changed": ttl_changed,
+                           "updated": update and diff.changed, **diff.summary()}, separators=(",", ":"))
+    if output == "none":
+        return ""
+    return "\n".join(out)
+
+
+def sync_zones(api: NcAPI, zones: list, ip: Addresses, update: bool, ttl: int = None, jobs: int = 4,
+               timings: Timings = NO_TIMINGS, output: str = "table", journal: Journal = None) -> bool:
+    """
+    Sync all zones concurrently over one logged in api session and print each report once its zone is done.
+    :param api: logged in NcAPI
+    :param zones: list of nc_api.utils.config.Zone
+    :param ip: external Addresses (for dyndns)
+    :param update: push changed records
+    :param ttl: new ttl or None to leave it alone
+    :param jobs: maximum number of zones processed at the same time
+    :param timings: records the wall time of every step
+    :param output: one of OUTPUTS
+    :param journal: optional Journal the published changes are appended to
+    :return: True if all zones were synced successfully
+    """
+    return process_zones(sync_zone, [dict(api=api, domainname=z.domainname,
+                                          new_set=build_recordset(hosts=z.hosts, ip=ip.ipv4, ip6=ip.ipv6),
+                                          update=update, ttl=ttl, timings=timings, output=output,
+                                          journal=journal)
+                                     for z in zones], jobs=jobs)
+
+
+def process_zones(func, calls: list, jobs: int = 4) -> bool:
+    """
+    Call func once per zone concurrently and print each report once its zone is done.
+    :param func: function returning the report of a zone, e.g. sync_zone
+    :param calls: list of keyword argument dictionaries for func, each with a 'domainname'
+    :param jobs: maximum number of zones processed at the same time, with 1 they run in the calling thread
+    :return: True if all calls succeeded
+    """
+    success = True
+    if jobs <= 1:
+        # no pool thread, e.g. for --profile
+        for kwargs in calls:
+            try:
+                report = func(**kwargs)
+                if report:
+                    print(report)
+            except Exception:
+                success = False
+                logging.exception(f"{func.__name__} of {kwargs['domainname']} failed")
+        return success
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(func, **kwargs): kwargs["domainname"] for kwargs in calls}
+        for future in as_completed(futures):
+            try:
+                report = future.result()
+                if report:
+                    print(report)
+            except Exception:
+                success = False
+                logging.exception(f"{func.__name__} of {futures[future]} failed")
+
+    return success
+
+
+def publish(api: NcAPI, zone: DNSZone, diff: RecordSetDiff, timings: Timings = NO_TIMINGS, journal: Journal = None):
+    """
+    Send the changes in a single updateDnsRecords call, count them in the RECORDS_CHANGED metric and append them to
+    the journal.
+    :param api: logged in NcAPI
+    :param zone: the zone as read before the diff was made
+    :param diff: RecordSetDiff to apply
+    :param timings: records the wall time of every step
+    :param journal: optional Journal
+    :return: None
+    """
+    start = time.perf_counter()
+    with timings.phase("updateDnsRecords", zone=zone.name):
+        api.updateDnsRecords(zone=zone, recordset=diff.changes())
+    latency = time.perf_counter() - start
+
+    for change in ("created", "modified", "deleted"):
+        RECORDS_CHANGED.inc(len(getattr(diff, change)), zone=zone.name, change=change)
+    if journal is not None:
+        journal.record(zone=zone.name, serial=zone.serial, diff=diff, latency=latency)
+
+
+def zone_report(title: str, domainname: str, serial: str, diff: RecordSetDiff, updated: bool,
+                output: str = "table", **fields) -> str:
+    """
+    Report of apply and plan.
+    :param title: first line of the table output, e.g. "applying domain"
+    :param domainname: domain name like example.com
+    :param serial: zone serial the diff is based on
+    :param diff: RecordSetDiff
+    :param updated: whether the changes were sent
+    :param output: one of OUTPUTS
+    :param fields: override fields of the json output
+    :return: report to print (empty for output none)
+    """
+    if output == "json":
+        return json.dumps({"zone": domainname, "serial": serial, "updated": updated, **diff.summary(), **fields},
+                          separators=(",", ":"))
+    if output == "none":
+        return ""
+    if not diff.changed:
+        return f"{title}:\t{domainname}\nrecords did not change, leaving it alone!"
+    return f"{title}:\t{domainname}\n{diff.table()}"
+
+
+def diff_zone(api: NcAPI, domainname: str, desired: DNSRecordSet, full: bool = True,
+              timings: Timings = NO_TIMINGS) -> tuple:
+    """
+    Read zone and records and compare them with the desired records while they are received.
+    :param api: logged in NcAPI
+    :param domainname: domain name like example.com
+    :param desired: DNSRecordSet with the desired records
+    :param full: desired is the complete zone (see diff_records)
+    :param timings: records the wall time of every step
+    :return: DNSZone and RecordSetDiff
+    """
+    with timings.phase("infoDnsZone", zone=domainname):
+        zone = api.infoDnsZone(domainname=domainname)
+    with timings.phase("infoDnsRecords+diff", zone=domainname):
+        diff = diff_records(live=api.iterDnsRecords(domainname=domainname, serial=zone.serial), desired=desired,
+                            full=full)
+    return zone, diff
+
+
+def apply_zone(api: NcAPI, domainname: str, desired: DNSRecordSet, timings: Timings = NO_TIMINGS,
+               output: str = "table", journal: Journal = None) -> str:
+    """
+    Make the records of a zone match the desired ones exactly.
+    Records missing in desired are deleted, priorities are compared as well. All changes are sent in a single
+    updateDnsRecords call.
+    :param api: logged in NcAPI
+    :param domainname: domain name like example.com
+    :param desired: DNSRecordSet with the complete desired zone
+    :param timings: records the wall time of every step
+    :param output: one of OUTPUTS
+    :param journal: optional Journal the published changes are appended to
+    :return: report to print (empty for output none)
+    """
+    zone, diff = diff_zone(api=api, domainname=domainname, desired=desired, timings=timings)
+
+    if diff.changed:
+        publish(api=api, zone=zone, diff=diff, timings=timings, journal=journal)
+
+    return zone_report("applying domain", domainname=domainname, serial=zone.serial, diff=diff, updated=diff.changed,
+                       output=output)
+
+
+def plan_zone(api: NcAPI, domainname: str, desired: DNSRecordSet, plan: list, full: bool = True,
+              timings: Timings = NO_TIMINGS, output: str = "table") -> str:
+    """
+    Compute the changes of a zone without applying them.
+    :param api: logged in NcAPI
+    :param domainname: domain name like example.com
+    :param desired: DNSRecordSet with the desired records
+    :param plan: list the zone entry (domainname, serial and diff) is appended to
+    :param full: desired is the complete zone (see diff_records)
+    :param timings: records the wall time of every step
+    :param output: one of OUTPUTS
+    :return: report to print (empty for output none)
+    """
+    zone, diff = diff_zone(api=api, domainname=domainname, desired=desired, full=full, timings=timings)
+    plan.append({"domainname": domainname, "serial": zone.serial, "diff": diff.json()})
+
+    return zone_report("planned domain", domainname=domainname, serial=zone.serial, diff=diff, updated=False,
+                       output=output)
+
+
+def apply_planned_zone(api: NcAPI, domainname: str, serial: str, diff: RecordSetDiff, unchanged: int = 0,
+                       timings: Timings = NO_TIMINGS, output: str = "table", journal: Journal = None) -> str:
+    """
+    Send the changes of a plan, without reading the records again.
+    :param api: logged in NcAPI
+    :param domainname: domain name like example.com
+    :param serial: zone serial the plan is based on
+    :param diff: planned RecordSetDiff
+    :param unchanged: number of unchanged records when the plan was made (not part of the diff)
+    :param timings: records the wall time of every step
+    :param output: one of OUTPUTS
+    :param journal: optional Journal the published changes are appended to
+    :return: report to print (empty for output none)
+    :raises PlanOutdated: if the zone changed since the plan was made
+    """
+    with timings.phase("infoDnsZone", zone=domainname):
+        zone = api.infoDnsZone(domainname=domainname)
+    if zone.serial != serial:
+        raise PlanOutdated(f"zone {domainname} changed since the plan was made (serial {serial} -> {zone.serial}), "
+                           f"plan again")
+
+    publish(api=api, zone=zone, diff=diff, timings=timings, journal=journal)
+
+    return zone_report("applying domain", domainname=domainname, serial=serial, diff=diff, updated=True,
+                       output=output, unchanged=unchanged)
+
+
+def write_plan(filename: str, plan: list, full: bool):
+    """
+    Write a plan file.
+    :param filename: where to write the plan, "-" for stdout
+    :param plan: zone entries, see plan_zone
+    :param full: whether the plan deletes records missing in the zone file
+    :return: None
+    """
+    content = json.dumps({"plan": PLAN_VERSION, "time": time.time(), "full": full,
+                          "zones": sorted(plan, key=lambda z: z["domainname"])}, indent=2)
+    if filename == "-":
+        print(content)
+        return
+    # replaced atomically, an interrupted write never leaves a truncated plan behind
+    tmp = f"{filename}.tmp"
+    with open(tmp, "w") as fp:
+        fp.write(content)
+    os.replace(tmp, filename)
+
+
+def load_zonefile(filename: str) -> tuple:
+    """
+    Read a plan or zone file, the file is parsed only once.
+    :param filename: plan or zone file
+    :return: (plan dictionary, None) for a plan, (None, HostsConfig) for a zone file
+    """
+    with open(filename, "rb") as fp:
+        content = fp.read()
+    config = decode_json(content, source=filename)
+
+    if not isinstance(config, dict) or "plan" not in config:
+        return None, parse_hosts(content, source=filename, config=config)
+    if config["plan"] != PLAN_VERSION:
+        raise ConfigError(f"{filename} is a plan of version {config['plan']}, expected {PLAN_VERSION}")
+    return config, None
+
+
+def log_cache_stats(zone_cache: ZoneCache = None):
+    """
+    Log zone cache hit/miss counters (visible with --verbose).
+    :param zone_cache: the cache or None
+    :return: None
     """
-    Imports the zone information from hosts file
+    if zone_cache is not None:
+        logging.debug(f"zone cache:\t{zone_cache.hits} hits, {zone_cache.misses} misses")
+
+
+def mark_published(ip: Addresses, digest: str, state: PublishState = None):
+    """
+    Remember a successful publish (metrics and optional state file).
+    :param ip: published Addresses
+    :param digest: config digest
+    :param state: optional publish state
+    :return: None
+    """
+    LAST_PUBLISH.set(time.time())
+    if state is not None:
+        state.save(ip=ip, digest=digest)
+
+
+def run_apply(settings: dict, config: HostsConfig, jobs: int = 4, deadline: float = None, timings: Timings = NO_TIMINGS,
+              output: str = "table", plan: list = None, full: bool = True, journal: Journal = None) -> bool:
+    """
+    Apply the complete desired state of all zones in config (see apply_zone).
+    With plan given, nothing is applied, the zone entries are appended to plan instead (see plan_zone).
+    The external ip is only looked up if a host has no destination. Zones with a host whose address family was not
+    found are left alone, since the missing record would be deleted otherwise.
+    :param settings: settings dictionary
+    :param config: zone file with the complete records of each zone
+    :param jobs: maximum number of zones processed at the same time
+    :param deadline: seconds the run may take at most
+    :param timings: records the wall time of every step
+    :param output: one of OUTPUTS
+    :param plan: optional list to plan into
+    :param full: config holds the complete zones, only for plans (apply is always full)
+    :param journal: optional Journal the published changes are appended to
+    :return: True if successful
+    """
+    with make_session(settings, jobs=jobs) as session:
+        session.deadline = Deadline(deadline)
+        timings.attach(session)
+
+        ip = Addresses()
+        if config.needs_ip:
+            with timings.phase("ip lookup"):
+                ip = get_addresses((make_resolver(settings, version=4, session=session),
+                                    make_resolver(settings, version=6, session=session)))
+            if ip is None:
+                return False
+
+        calls, success = [], True
+        for z in config.zones:
+            try:
+                desired = build_recordset(hosts=z.hosts, ip=ip.ipv4, ip6=ip.ipv6, strict=True)
+            except AddressUnknown as e:
+                logging.error(f"leaving {z.domainname} alone: {e}")
+                success = False
+                continue
+            calls.append(dict(domainname=z.domainname, desired=desired, timings=timings, output=output))
+        if plan is not None:
+            func = plan_zone
+            calls = [dict(plan=plan, full=full, **kwargs) for kwargs in calls]
+        else:
+            func = apply_zone
+            calls = [dict(journal=journal, **kwargs) for kwargs in calls]
+        if calls:
+            with timings.phase("sync"), make_api(settings, session=session) as api:
+                success = process_zones(func, [dict(api=api, **kwargs) for kwargs in calls], jobs=jobs) and success
+        return success
+
+
+def run_apply_plan(settings: dict, plan: dict, jobs: int = 4, deadline: float = None, timings: Timings = NO_TIMINGS,
+                   output: str = "table", journal: Journal = None) -> bool:
+    """
+    Apply a plan (see load_zonefile). Zones without changes are skipped, the others are only checked for a moved serial
+    before their changes are sent.
+    :param settings: settings dictionary
+    :param plan: plan dictionary
+    :param jobs: maximum number of zones processed at the same time
+    :param deadline: seconds the run may take at most
+    :param timings: records the wall time of every step
+    :param output: one of OUTPUTS
+    :param journal: optional Journal the published changes are appended to
+    :return: True if successful
+    """
+    calls = []
+    for entry in plan["zones"]:
+        diff = RecordSetDiff.from_json(entry["diff"])
+        if not diff.changed:
+            report = zone_report("applying domain", domainname=entry["domainname"], serial=entry["serial"],
+                                 diff=diff, updated=False, output=output, unchanged=entry["diff"]["unchanged"])
+            if report:
+                print(report)
+            continue
+        calls.append(dict(domainname=entry["domainname"], serial=entry["serial"], diff=diff,
+                          unchanged=entry["diff"]["unchanged"], timings=timings, output=output, journal=journal))
+    if not calls:
+        return True
+
+    with make_session(settings, jobs=jobs) as session:
+        session.deadline = Deadline(deadline)
+        timings.attach(session)
+        with timings.phase("sync"), make_api(settings, session=session) as api:
+            return process_zones(apply_planned_zone, [dict(api=api, **kwargs) for kwargs in calls], jobs=jobs)
+
+
+def run_daemon(settings: dict, config: HostsConfig, interval: int, update: bool, ttl: int = None,
+               state: PublishState = None, zone_cache: ZoneCache = None, jobs: int = 4, deadline: float = None,
+               watcher: NetlinkWatcher = None, metrics_file: str = None, timings: Timings = NO_TIMINGS,
+               output: str = "table", journal: Journal = None):
+    """
+    Poll the external ip every interval seconds and sync the zone whenever it changed.
+    With a watcher, a poll is also triggered right after the watched network interface changed.
+    The process, the http session and the hosts file content are kept between polls.
+    :param settings: settings dictionary
+    :param config: the hosts file
+    :param interval: seconds between two polls
+    :param update: push changed records
+    :param ttl: new ttl or None to leave it alone
+    :param state: optional publish state, used to skip the first sync after a restart
+    :param zone_cache: optional cache for dns records
+    :param jobs: maximum number of zones processed at the same time
+    :param deadline: seconds every poll (including the sync) may take at most
+    :param watcher: optional NetlinkWatcher of the wan interface
+    :param metrics_file: optional file the metrics are written to after every poll
+    :param timings: records the wall time of every step
+    :param output: one of OUTPUTS
+    :param journal: optional Journal the published changes are appended to
+    :return: never
+    """
+    digest = config.digest(ttl=ttl)
+    session = make_session(settings, jobs=jobs)
+    timings.attach(session)
+    resolvers = make_resolver(settings, version=4, session=session), make_resolver(settings, version=6, session=session)
+
+    last_ip = None
+    if state is not None:
+        published = state.load()
+        if published.get("digest") == digest:
+            last_ip = published.get("ip")
+        if "time" in published:
+            LAST_PUBLISH.set(published["time"])
+    with session:
+        while True:
+            session.deadline = Deadline(deadline)
+            try:
+                with timings.phase("ip lookup"):
+                    ip = get_addresses(resolvers)
+                if ip is None:
+                    # already logged, try again on the next poll
+                    pass
+                elif str(ip) == last_ip:
+                    logging.debug(f"external ip {ip} did not change")
+                else:
+                    if output == "table":
+                        print(f"found external ip:\t{ip}")
+                    elif output == "json":
+                        echo_json(ip=str(ip))
+                    with timings.phase("sync"), make_api(settings, session=session, zone_cache=zone_cache) as api:
+                        success = sync_zones(api=api, zones=config.zones, ip=ip, update=update, ttl=ttl, jobs=jobs,
+                                             timings=timings, output=output, journal=journal)
+                    log_cache_stats(zone_cache)
+                    # failed zones are retried on the next poll
+                    if success:
+                        last_ip = str(ip)
+                        if update:
+                            mark_published(ip=ip, digest=digest, state=state)
+            except Exception:
+                # keep running, the next poll will try again
+                logging.exception(f"sync failed")
+
+            if metrics_file is not None:
+                write_textfile(metrics_file)
+
+            if watcher is not None:
+                watcher.wait(timeout=interval)
+            else:
+                time.sleep(interval)
+
+
+def run_once(settings: dict, config: HostsConfig, update: bool, ttl: int = None, state: PublishState = None,
+             zone_cache: ZoneCache = None, jobs: int = 4, deadline: float = None,
+             timings: Timings = NO_TIMINGS, output: str = "table", journal: Journal = None) -> bool:
+    """
+    Look up the external ip and sync all zones once.
+    :param settings: settings dictionary
+    :param config: the hosts file
+    :param update: push changed records
+    :param ttl: new ttl or None to leave it alone
+    :param state: optional publish state, skips the api if nothing changed since the last publish
+    :param zone_cache: optional cache for dns records
+    :param jobs: maximum number of zones processed at the same time
+    :param deadline: seconds the run may take at most
+    :param timings: records the wall time of every step
+    :param output: one of OUTPUTS
+    :param journal: optional Journal the published changes are appended to
+    :return: True if successful (or nothing to do)
+    """
+    if state is not None:
+        published_time = state.load().get("time")
+        if published_time is not None:
+            LAST_PUBLISH.set(published_time)
+
+    with make_session(settings, jobs=jobs) as session:
+        session.deadline = Deadline(deadline)
+        timings.attach(session)
+
+        # get external ip
+        with timings.phase("ip lookup"):
+            ip = get_addresses((make_resolver(settings, version=4, session=session),
+                                make_resolver(settings, version=6, session=session)))
+        if ip is None:
+            return False
+        if output == "table":
+            print(f"found external ip:\t{ip}")
+
+        # skip all api calls if this ip and config were published already
+        digest = config.digest(ttl=ttl)
+        current = state is not None and state.is_current(ip=ip, digest=digest)
+        if output == "json":
+            echo_json(ip=str(ip), skipped=current)
+        if current:
+            if output == "table":
+                print("ip and hosts did not change since last update, leaving it alone!")
+            return True
+
+        # api related part, all zones share one login (login and logout show up as http events)
+        with timings.phase("sync"), make_api(settings, session=session, zone_cache=zone_cache) as api:
+            success = sync_zones(api=api, zones=config.zones, ip=ip, update=update, ttl=ttl, jobs=jobs, timings=timings,
+                                 output=output, journal=journal)
+        log_cache_stats(zone_cache)
+
+    if success and update:
+        mark_published(ip=ip, digest=digest, state=state)
+
+    return success
+
+
+class DefaultGroup(click.Group):
+    """
+    Group running its default command if the first argument is no subcommand, so `dyndns CONF HOSTS` keeps working.
+    """
+
+    def __init__(self, *args, default: str = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default = default
+
+    def parse_args(self, ctx, args):
+        if args and args[0] not in self.commands and args[0] not in ctx.help_option_names:
+            args = [self.default, *args]
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=DefaultGroup, default="sync")
+def dyndns():
+    """
+    Dynamic dns for netcup. Without a command, sync is run.
+    """
+
+
+def read_settings(conf: str, verbose: bool = False) -> dict:
+    """
+    Configure logging and read the settings file.
+    :param conf: where the settings file is located
+    :param verbose: debugging output
+    :return: settings dictionary
+    """
+    if verbose:
+        logging.basicConfig(level=logging.DEBUG)
+
+    with open(conf) as fp:
+        settings = json.load(fp)
+    logging.debug(f"settings from file:\t{settings}")
+    return settings
+
+
+def read_hosts(filename: str, settings: dict) -> HostsConfig:
+    """
+    Read and validate the hosts file, errors end the command before anything is sent.
     :param filename: where the hosts file is located
-    :return: domain name
+    :param settings: settings dictionary, to check the address sources
+    :return: HostsConfig
+    """
+    try:
+        config = load_hosts(filename)
+        check_sources(config, settings, source=filename)
+    except ConfigError as e:
+        raise click.ClickException(str(e))
+    return config
+
+
+def open_journal(settings: dict) -> Journal:
+    """
+    Open the change journal configured with JOURNAL in the settings.
+    :param settings: settings dictionary
+    :return: Journal or None if no journal is configured
+    """
+    filename = settings.get("JOURNAL")
+    return Journal(filename) if filename else None
+
+
+@dyndns.command()
+@click.argument("conf", type=click.Path(exists=True))
+@click.argument("zonefile", type=click.Path(exists=True))
+@click.option("--out", "-o", type=click.Path(dir_okay=False, allow_dash=True),
+              help="write the plan to this file, defaults to stdout.", default="-")
+@click.option("--partial", "-p", help="like sync: only the listed hosts, records missing in ZONEFILE are kept.",
+              is_flag=True)
+@click.option("--verbose", "-v", help="debugging output.", is_flag=True)
+@click.option("--jobs", "-j", type=int, help="number of zones processed in parallel, defaults to 4.", default=4)
+@click.option("--deadline", type=float, help="seconds the run may take at most.", default=None)
+def plan(conf, zonefile, out: str="-", partial: bool=False, verbose: bool=False, jobs: int=4, deadline: float=None):
     """
-    # read file ('host' section contains a list)
-    with open(filename) as fp:
-        zone = json.load(fp)["zone"]
+    Compute the changes needed for ZONEFILE without applying them.
 
-    return zone["domainname"]
+    The plan holds the changes and the serial of every zone, apply it later with `dyndns apply CONF PLAN`.
+    """
+    settings = read_settings(conf, verbose=verbose)
+    config = read_hosts(zonefile, settings)
+    zones = []
+    # the changes are shown unless the plan itself goes to stdout
+    success = run_apply(settings=settings, config=config, jobs=jobs, deadline=deadline,
+                        output="none" if out == "-" else "table", plan=zones, full=not partial)
+    if not success:
+        sys.exit(1)
+    write_plan(out, plan=zones, full=not partial)
 
 
-def modify_recordset(old_set: DNSRecordSet, new_set: DNSRecordSet) -> (DNSRecordSet, bool):
-    changed = False
-    for new_record in new_set.dnsrecords:
-        # record with this hostname exists
-        if new_record.hostname in old_set:
-            # get record and update it
-            old_record = old_set.get_by_hostname(new_record.hostname)
-            # check if update needed
-            if old_record.needs_update(record=new_record):
-                changed = True
-                old_record.destination = new_record.destination
-                old_record.type = new_record.type
+@dyndns.command()
+@click.argument("conf", type=click.Path(exists=True))
+@click.argument("zonefile", type=click.Path(exists=True))
+@click.option("--verbose", "-v", help="debugging output.", is_flag=True)
+@click.option("--jobs", "-j", type=int, help="number of zones processed in parallel, defaults to 4.", default=4)
+@click.option("--deadline", type=float, help="seconds the run may take at most.", default=None)
+@click.option("--timings", "timings_file", type=click.Path(dir_okay=False, allow_dash=True),
+              help="append wall times of all phases and http requests as json lines to this file (- for stderr).",
+              default=None)
+@click.option("--output", "-o", type=click.Choice(OUTPUTS),
+              help="table (default), json (one compact line per zone) or none.", default="table")
+def apply(conf, zonefile, verbose: bool=False, jobs: int=4, deadline: float=None, timings_file: str=None,
+          output: str="table"):
+    """
+    Make the zones in ZONEFILE match it exactly, or apply a plan (see plan).
+
+    ZONEFILE has the format of the hosts file, but lists all records of each zone (with 'priority' where needed).
+    Records which are not listed are deleted! All changes of a zone are sent in one request.
 
-        # does not exist, create it
+    A plan is applied without reading the records again. Zones changed since the plan was made are refused.
+    """
+    settings = read_settings(conf, verbose=verbose)
+    try:
+        saved_plan, config = load_zonefile(zonefile)
+        if config is not None:
+            check_sources(config, settings, source=zonefile)
+    except ConfigError as e:
+        raise click.ClickException(str(e))
+    timings = Timings.open(timings_file) if timings_file is not None else NO_TIMINGS
+    journal = open_journal(settings)
+    try:
+        if saved_plan is not None:
+            success = run_apply_plan(settings=settings, plan=saved_plan, jobs=jobs, deadline=deadline,
+                                     timings=timings, output=output, journal=journal)
         else:
-            changed = True
-            old_set.add(new_record)
+            success = run_apply(settings=settings, config=config, jobs=jobs, deadline=deadline,
+                                timings=timings, output=output, journal=journal)
+    finally:
+        timings.close()
+        if journal is not None:
+            journal.close()
+
+    if not success:
+        sys.exit(1)
+
+
+def parse_time(value: str) -> float:
+    """
+    Parse a point in time given on the command line.
+    :param value: ISO date or date and time (local time unless an offset is given), or an age like 30m, 12h or 7d
+    :return: unix time
+    """
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    if value[-1:] in units and value[:-1].isdigit():
+        return time.time() - int(value[:-1]) * units[value[-1]]
+    from datetime import datetime
+
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise click.BadParameter(f"{value!r} is neither an ISO date nor an age like 12h or 7d")
+
+
+@dyndns.command()
+@click.argument("conf", type=click.Path(exists=True))
+@click.option("--host", "-H", help="only changes of this hostname.", default=None)
+@click.option("--zone", "-z", help="only changes of this zone.", default=None)
+@click.option("--since", "-s", help="only changes at or after this ISO date/time or age (e.g. 12h, 7d).", default=None)
+@click.option("--until", "-u", help="only changes before this ISO date/time or age.", default=None)
+@click.option("--limit", "-n", type=int, help="maximum number of changes, defaults to 100.", default=100)
+@click.option("--output", "-o", type=click.Choice(OUTPUTS[:2]),
+              help="table (default) or json (one compact line per change).", default="table")
+def history(conf, host: str=None, zone: str=None, since: str=None, until: str=None, limit: int=100,
+            output: str="table"):
+    """
+    Show the published changes recorded in the journal (JOURNAL in the settings), newest first.
+    """
+    settings = read_settings(conf)
+    if not settings.get("JOURNAL"):
+        raise click.ClickException(f"no JOURNAL configured in {conf}")
+
+    with open_journal(settings) as journal:
+        changes = journal.history(hostname=host, zone=zone, since=parse_time(since) if since else None,
+                                  until=parse_time(until) if until else None, limit=limit)
 
-    # finally return the modified set
-    return old_set, changed
+    if output == "json":
+        for change in changes:
+            echo_json(**change)
+        return
+
+    from tabulate import tabulate
 
+    rows = [[time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(c["time"])), c["zone"], c["serial"], c["hostname"],
+             c["type"], c["change"], c["old_destination"] or "", c["new_destination"] or "",
+             "" if c["latency"] is None else f"{c['latency']:.3f}"] for c in changes]
+    print(tabulate(rows, tablefmt="orgtbl", headers=["time", "zone", "serial", "hostname", "type", "change", "old",
+                                                     "new", "latency [s]"]))
 
-@click.command()
+
+@dyndns.command()
 @click.argument("conf", type=click.Path(exists=True))
 @click.argument("hosts", type=click.Path(exists=True))
 @click.option("--update", "-u", help="update settings, defaults to False.", is_flag=True)
 @click.option("--verbose", "-v", help="debugging output.", is_flag=True)
 @click.option("--ttl", "-t", type=int, help="change zone ttl to integer, defaults to not change ttl.", default=None)
-def dyndns(conf, hosts, update: bool=False, ttl: int=None, verbose: bool=False):
+@click.option("--daemon", "-d", help="keep running and sync whenever the external ip changes.", is_flag=True)
+@click.option("--interval", "-i", type=int, help="seconds between ip polls in daemon mode, defaults to 300.",
+              default=300)
+@click.option("--state", "-s", type=click.Path(dir_okay=False),
+              help="state file remembering the last published ip, skips the api if nothing changed.", default=None)
+@click.option("--zone-cache", "-c", type=click.Path(file_okay=False),
+              help="directory caching dns records per zone serial.", default=None)
+@click.option("--jobs", "-j", type=int, help="number of zones processed in parallel, defaults to 4.", default=4)
+@click.option("--deadline", type=float, help="seconds a run (or a poll in daemon mode) may take at most.",
+              default=None)
+@click.option("--watch", "-w", help="daemon mode: also poll as soon as this network interface changes (linux).",
+              default=None)
+@click.option("--debounce", type=float, help="seconds the watched interface has to be quiet, defaults to 2.",
+              default=None)
+@click.option("--metrics-port", type=int, help="daemon mode: serve prometheus metrics on this port.", default=None)
+@click.option("--metrics-file", type=click.Path(dir_okay=False),
+              help="write prometheus metrics to this file (textfile collector).", default=None)
+@click.option("--timings", "timings_file", type=click.Path(dir_okay=False, allow_dash=True),
+              help="append wall times of all phases and http requests as json lines to this file (- for stderr).",
+              default=None)
+@click.option("--profile", type=click.Path(dir_okay=False),
+              help="dump cProfile stats of a oneshot run to this file (zones are then synced one after another).",
+              default=None)
+@click.option("--output", "-o", type=click.Choice(OUTPUTS),
+              help="table (default), json (one compact line per zone) or none.", default="table")
+def sync(conf, hosts, update: bool=False, ttl: int=None, verbose: bool=False, daemon: bool=False,
+         interval: int=300, state: str=None, zone_cache: str=None, jobs: int=4, deadline: float=None,
+         watch: str=None, debounce: float=None, metrics_port: int=None, metrics_file: str=None,
+         timings_file: str=None, profile: str=None, output: str="table"):
     """
     This script updates dns zone ttl and records based on the HOST file.
     See an example in hosts.sample.
@@ -93,81 +1004,88 @@ def dyndns(conf, hosts, update: bool=False, ttl: int=None, verbose: bool=False):
 
     Additionally the api credentials must be passed via the settings.json file (again see settings.json.sample).
 
-    !!!
-    Please review your config in hosts.json, this script will NOT check the sanity of your dns entries.
-    !!!
+    The hosts file is validated before anything is sent (keys, record types, hostnames, addresses and whether an
+    address source is configured for hosts without destination). What the records point to is up to you.
     """
-    if verbose:
-        logging.basicConfig(level=logging.DEBUG)
+    if not daemon:
+        # a oneshot run (e.g. a timer unit) would silently ignore them
+        for name, value in (("--watch", watch), ("--debounce", debounce), ("--metrics-port", metrics_port)):
+            if value is not None:
+                raise click.UsageError(f"{name} only works with --daemon")
+    if debounce is not None and watch is None:
+        raise click.UsageError("--debounce only works with --watch")
+    if profile is not None and daemon:
+        # the daemon is stopped by a signal, the stats would never be dumped
+        raise click.UsageError("--profile only works without --daemon")
 
-    logging.debug(f"settings path:\t{conf}")
-    logging.debug(f"hosts path:\t{hosts}")
-    logging.debug(f"update:\t{update}")
-    logging.debug(f"ttl:\t{ttl}")
+    timings = Timings.open(timings_file) if timings_file is not None else NO_TIMINGS
+    profiler = None
+    if profile is not None:
+        import cProfile
 
-    # read settings from file
-    with open(conf) as fp:
-        settings = json.load(fp)
-    logging.debug(f"settings from file:\t{settings}")
+        # cProfile only sees the main thread, the zones would be synced in pool threads otherwise
+        if jobs != 1:
+            logging.warning(f"--profile: syncing zones with --jobs 1 instead of {jobs}")
+            jobs = 1
 
-    # get external ip
-    fritzbox_ip = settings.get("FRITZBOX_IP")
-    if fritzbox_ip is not None:
-        logging.debug(f"getting external ip via FRITZ!Box API on {fritzbox_ip}")
-        ip = ExternalFritzbox(fritzbox_ip).ip
-    else:
-        logging.debug(f"getting external ip via ipify API")
-        ip = ExternalIpify().ip
-    if ip is None:
-        logging.error(f"unable to find external ip")
-        return
-    print(f"found external ip:\t{ip}")
+        profiler = cProfile.Profile()
+        profiler.enable()
 
-    # import domain name from file
-    domainname = import_zone(filename=hosts)
-    print(f"working on domain:\t{domainname}")
+    try:
+        run(conf=conf, hosts=hosts, update=update, ttl=ttl, verbose=verbose, daemon=daemon, interval=interval,
+            state=state, zone_cache=zone_cache, jobs=jobs, deadline=deadline, watch=watch, debounce=debounce,
+            metrics_port=metrics_port, metrics_file=metrics_file, timings=timings, output=output)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile)
+        timings.close()
 
-    # import hosts from file
-    new_set = import_hosts(filename=hosts, ip=ip)
 
-    # api related part
-    with NcAPI(api_url=settings["API_URL"],
-               api_key=settings["API_KEY"],
-               api_password=settings["API_PASSWORD"],
-               customer_id=settings["CUSTOMER_ID"]) as api:
-        # read current dns zone
-        zone = api.infoDnsZone(domainname=domainname)
-        print(zone.table())
+def run(conf, hosts, update: bool, ttl: int, verbose: bool, daemon: bool, interval: int, state: str, zone_cache: str,
+        jobs: int, deadline: float, watch: str, debounce: float, metrics_port: int, metrics_file: str,
+        timings: Timings, output: str):
+    """
+    Body of the dyndns command, see there.
+    """
+    # read settings from file
+    with timings.phase("read settings"):
+        settings = read_settings(conf, verbose=verbose)
 
-        # read current host records
-        old_set = api.infoDnsRecords(domainname=domainname)
-        print(old_set.table())
+    logging.debug(f"settings path:\t{conf}")
+    logging.debug(f"hosts path:\t{hosts}")
+    logging.debug(f"update:\t{update}")
+    logging.debug(f"ttl:\t{ttl}")
 
-        # modify set
-        updated_set, changed = modify_recordset(old_set=old_set, new_set=new_set)
-        print("\nupdated set:")
-        print(updated_set.table())
+    # validate the hosts file before any network request
+    with timings.phase("import hosts"):
+        config = read_hosts(hosts, settings)
 
-        if ttl is not None:
-            print("updating ttl ...")
-            if zone.ttl == ttl:
-                print("ttl has not changed, leaving it alone!")
-            else:
-                zone.ttl = ttl
-                api.updateDnsZone(zone=zone)
+    publish_state = PublishState(state) if state is not None else None
+    records_cache = ZoneCache(zone_cache) if zone_cache is not None else None
+    journal = open_journal(settings)
 
-                # read zone again
-                print(api.infoDnsZone(domainname=domainname).table())
+    if daemon:
+        if metrics_port is not None:
+            start_http_server(port=metrics_port, address=settings.get("METRICS_ADDRESS", "127.0.0.1"))
+        watcher = NetlinkWatcher(watch, debounce=2.0 if debounce is None else debounce) if watch is not None else None
+        run_daemon(settings=settings, config=config, interval=interval, update=update, ttl=ttl, state=publish_state,
+                   zone_cache=records_cache, jobs=jobs, deadline=deadline, watcher=watcher, metrics_file=metrics_file,
+                   timings=timings, output=output, journal=journal)
+        return
 
-        if update:
-            print("\n updating records ...")
-            if changed:
-                api.updateDnsRecords(zone=zone, recordset=updated_set)
+    try:
+        success = run_once(settings=settings, config=config, update=update, ttl=ttl, state=publish_state,
+                           zone_cache=records_cache, jobs=jobs, deadline=deadline, timings=timings,
+                           output=output, journal=journal)
+    finally:
+        if metrics_file is not None:
+            write_textfile(metrics_file)
+        if journal is not None:
+            journal.close()
 
-                # read current host records
-                print(api.infoDnsRecords(domainname=domainname).table())
-            else:
-                print("records did not change, leaving it alone!")
+    if not success:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -3,4 +3,4 @@ NcAPI and dataclasses can be imported on top level.
 """
 
 from .nc_api import NcAPI
-from .dns import DNSRecord, DNSRecordSet, DNSZone
+from .dns import DNSRecord, CompactDNSRecord, DNSRecordSet, DNSZone, RecordSetDiff
@@ -0,0 +1,146 @@
+"""
+Netcup API implementation for asyncio (based on aiohttp, which is optional: pip install aiohttp).
+"""
+
+import logging
+
+try:
+    from aiohttp import ClientSession, ClientTimeout
+except ImportError as e:
+    raise ImportError("nc_api.async_nc_api needs aiohttp, install it with `pip install aiohttp`") from e
+
+from .exceptions import *
+from .dns import DNSRecord, DNSZone, DNSRecordSet
+from .nc_api import NcAPIBase
+from .utils.fast_json import HEADERS, dumps, loads
+
+
+class AsyncNcAPI(NcAPIBase):
+    """
+    Manage the netcup dns nc_api via aiohttp, use it as an async contextmanager.
+    Many calls (also on different instances sharing one ClientSession) can be in flight on the same event loop.
+    """
+
+    def __init__(self, api_url: str, api_password: str, api_key: str, customer_id: str,
+                 session: ClientSession = None, timeout: float = 30.0, record_class=DNSRecord):
+        """
+        :param session: optional aiohttp session to reuse, it is not closed on exit
+        :param timeout: total timeout per request in seconds
+        :param record_class: class of the records read from the api, DNSRecord or CompactDNSRecord
+        """
+        super().__init__(api_url=api_url, api_password=api_password, api_key=api_key, customer_id=customer_id,
+                         record_class=record_class)
+
+        self._session = session
+        self._owns_session = session is None
+        self._timeout = ClientTimeout(total=timeout)
+
+    async def __aenter__(self):
+        try:
+            await self._login()
+        except BaseException:
+            # __aexit__ is not called if entering fails
+            await self._close_session()
+            raise
+        return self
+
+    async def __aexit__(self, *args, **kwargs):
+        try:
+            if self._session_id is not None:
+                await self._logout()
+        finally:
+            await self._close_session()
+
+    async def _close_session(self):
+        """
+        Close the aiohttp session if it was created by this instance.
+        :return: None
+        """
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def session(self) -> ClientSession:
+        """
+        Return a session object, it has to be created within a running event loop.
+        :return: session object
+        """
+        if self._session is None:
+            self._session = ClientSession()
+
+        return self._session
+
+    async def _send(self, payload: dict) -> dict:
+        """
+        Post nc_api request and raise if an error occured.
+        :param payload: dictionary of json payload
+        :return: request reponse
+        """
+        logging.debug("posting request with payload %s", payload)
+
+        async with self.session.post(self._api_url, data=dumps(payload), headers=HEADERS, timeout=self._timeout) as r:
+            r.raise_for_status()
+            # netcup does not always send a json content type
+            response = loads(await r.read())
+
+        return self.check_response(response)
+
+    async def _login(self):
+        """
+        Login to access nc_api.
+        :return:
+        """
+        data = await self._send(self.nc_request(action="login", parameters={"apipassword": self._api_password}))
+
+        self._session_id = data["apisessionid"]
+
+        logging.info(f"logged in successfully with session id {self._session_id}")
+
+    async def _logout(self):
+        """
+        Logout.
+        :return:
+        """
+        await self._send(self.nc_request(action="logout"))
+        logging.info(f"logged out successfully")
+        self._session_id = None
+
+    async def infoDnsZone(self, domainname: str) -> DNSZone:
+        """
+        Returns information in the dns zone of given domain.
+        :param domainname: domain name like netcup.de
+        :return: DNSZone
+        """
+        response = await self._send(self.nc_request(action="infoDnsZone", parameters={"domainname": domainname}))
+
+        return self.build_zone(domainname=domainname, responsedata=response)
+
+    async def infoDnsRecords(self, domainname: str) -> DNSRecordSet:
+        """
+        Returns information in the dns records (aka host entries) of given domain.
+        :param domainname: domain name like netcup.de
+        :return: DNSRecordSet
+        """
+        response = await self._send(self.nc_request(action="infoDnsRecords", parameters={"domainname": domainname}))
+
+        return self.build_recordset(responsedata=response, record_class=self._record_class)
+
+    async def updateDnsZone(self, zone: DNSZone):
+        """
+        Update/change the given dns zone.
+        :param zone: dns zone dataclass
+        :return:
+        """
+        await self._send(self.nc_request(action="updateDnsZone",
+                                         parameters={"domainname": zone.name, "dnszone": zone.json()}))
+
+    async def updateDnsRecords(self, zone: DNSZone, recordset: DNSRecordSet):
+        """
+        Update/change a given set of dns records.
+        :param zone: the according dns zone has to be given to update the right domain
+        :param recordset: dns record set
+        :return:
+        """
+        await self._send(self.nc_request(action="updateDnsRecords",
+                                         parameters={"domainname": zone.name, "dnsrecordset": recordset.json()}))
@@ -1,38 +1,24 @@
 """
 Specifies the dataclasses which are used.
 These are equivalent to the datatypes defined in netcups's nc_api.
-Thy can be exported as a dictionary by using the dataclasses.asdict() method.
-On the other hand requests can take this dict and parse it to json.
-This let's you directly pass these instances to the nc_api and make for a very transparent process.
+Their json() methods (and record_json for single records) build the json like dictionaries sent to the nc_api
+directly from the fields, so these instances can be passed to the nc_api for a very transparent process.
 """
 
 import dataclasses
+import sys
 from dataclasses import dataclass
-from typing import List
-
-from tabulate import tabulate
+from operator import attrgetter
+from typing import Dict, Iterable, List, Tuple
 
 from .exceptions import *
 
 
-class JSONMixin:
-    """
-    Mixin used to refactor the json export functionality.
-    """
-    def json(self) -> {}:
-        """
-        Return data class as json like dictionary.
-        See https://docs.python.org/3/library/dataclasses.html.
-        :return: json like dictionary
-        """
-        return dataclasses.asdict(self)
-
-
 @dataclass
 class DNSRecord:
     """
     Dataclass for a single dns record.
-    This does not correspond to a nc_api datatype and therefore does not inherit the mixin's json method.
+    This does not correspond to a nc_api datatype, it is serialized by record_json (as part of a DNSRecordSet).
     """
     hostname: str
     destination: str
@@ -51,59 +37,201 @@ class DNSRecord:
         return self.destination != record.destination or self.type != record.type
 
 
+def _slotted(cls):
+    """
+    Recreate a dataclass with __slots__ instead of a per instance __dict__ (dataclass(slots=True) needs python 3.10).
+    :param cls: dataclass
+    :return: new class with the same fields and methods
+    """
+    names = tuple(f.name for f in dataclasses.fields(cls))
+    cls_dict = {k: v for k, v in cls.__dict__.items() if k not in names + ("__dict__", "__weakref__")}
+    cls_dict["__slots__"] = names
+    return type(cls)(cls.__name__, cls.__bases__, cls_dict)
+
+
+@_slotted
+@dataclass
+class CompactDNSRecord:
+    """
+    Same as DNSRecord, but without a per instance __dict__ and with interned type, destination and state strings
+    (all records pointing to the external ip share one string). Meant for big zones (see NcAPI's record_class),
+    benchmarks/bench_memory.py compares both.
+    """
+    hostname: str
+    destination: str
+    type: str
+    id: int = None
+    priority: int = 0
+    deleterecord: bool = False
+    state: str = None
+
+    def __post_init__(self):
+        self.type = sys.intern(self.type)
+        self.destination = sys.intern(self.destination)
+        if self.state is not None:
+            self.state = sys.intern(self.state)
+
+    needs_update = DNSRecord.needs_update
+
+
+RECORD_FIELDS = tuple(f.name for f in dataclasses.fields(DNSRecord))
+
+_record_values = attrgetter(*RECORD_FIELDS)
+
+
+def record_json(record) -> dict:
+    """
+    Json like dictionary of a DNSRecord or CompactDNSRecord, like dataclasses.asdict but without the deep copy.
+    :param record: the record
+    :return: json like dictionary
+    """
+    return dict(zip(RECORD_FIELDS, _record_values(record)))
+
+
 @dataclass
-class DNSRecordSet(JSONMixin):
+class DNSRecordSet:
     """
     Basically a list of DNSRecord instances, but this maps to the datatype used by netcup.
     Also contains some helper methods.
+
+    Lookups by hostname and by (hostname, type) are served from an index by hostname (a hostname rarely has more than a
+    few records, so they are filtered by type). It is built on the first lookup, sets which are only iterated (like
+    the zones read from the api for diff_records) do not pay for it. Once built, add(), modify() and remove() keep it
+    consistent. If you change records or the dnsrecords list in any other way, call reindex() afterwards.
     """
     dnsrecords: List[DNSRecord]
 
-    def __contains__(self, hostname: str) -> bool:
+    def __post_init__(self):
+        # plain attribute (no dataclass field), so it is not part of the json export; None until the first lookup
+        self._by_hostname: Dict[str, List[DNSRecord]] = None
+
+    @property
+    def _hostnames(self) -> Dict[str, List[DNSRecord]]:
+        if self._by_hostname is None:
+            self.reindex()
+        return self._by_hostname
+
+    def __contains__(self, item) -> bool:
         """
-        Providing dunder method to check if a record woth the given hostname exists in the set.
-        :param hostname: the hostname as string
+        Providing dunder method to check if a record with the given hostname exists in the set.
+        :param item: the hostname as string or a (hostname, type) tuple
         :return: True if present, False if not
         """
-        try:
-            self.get_by_hostname(hostname=hostname)
-            return True
-        except RecordUnknown:
-            return False
+        if isinstance(item, tuple):
+            hostname, type = item
+            return any(r.type == type for r in self._hostnames.get(hostname, ()))
+        return item in self._hostnames
+
+    def __len__(self) -> int:
+        return len(self.dnsrecords)
+
+    def __iter__(self):
+        return iter(self.dnsrecords)
+
+    def json(self) -> {}:
+        """
+        Return the records as json like dictionary in one pass (see record_json).
+        :return: json like dictionary
+        """
+        return {"dnsrecords": [record_json(r) for r in self.dnsrecords]}
+
+    def _index(self, record: DNSRecord):
+        if self._by_hostname is not None:
+            self._by_hostname.setdefault(record.hostname, []).append(record)
+
+    def _unindex(self, record: DNSRecord):
+        if self._by_hostname is None:
+            return
+        bucket = self._by_hostname[record.hostname]
+        # compare by identity, records with equal content may exist more than once
+        bucket[:] = [r for r in bucket if r is not record]
+        if not bucket:
+            del self._by_hostname[record.hostname]
+
+    def reindex(self):
+        """
+        Rebuild the lookup index from dnsrecords.
+        :return: None
+        """
+        self._by_hostname = {}
+        for r in self.dnsrecords:
+            self._index(r)
 
     def table(self) -> str:
         """
         Nice representation.
         :return: string
         """
+        from tabulate import tabulate  # only needed for output, keeps the import time down
+
         r_table = [[r.hostname, r.type, r.destination, r.state] for r in self.dnsrecords]
         return tabulate(r_table, tablefmt="orgtbl", headers=["records", "", "", ""])
 
-    def get_by_hostname(self, hostname):
+    def get_by_hostname(self, hostname: str) -> DNSRecord:
         """
-        Return the record with given hostname.
+        Return the (first) record with given hostname.
         :param hostname: a string
         :return: a DNSRecord
         """
-        for r in self.dnsrecords:
-            if r.hostname == hostname:
+        try:
+            return self._hostnames[hostname][0]
+        except KeyError:
+            raise RecordUnknown(f"there is no record with hostname {hostname}")
+
+    def get(self, hostname: str, type: str) -> DNSRecord:
+        """
+        Return the (first) record with given hostname and type.
+        :param hostname: a string
+        :param type: record type like A or CNAME
+        :return: a DNSRecord
+        """
+        for r in self._hostnames.get(hostname, ()):
+            if r.type == type:
                 return r
-        raise RecordUnknown(f"there is nor record with hostname {hostname}")
+        raise RecordUnknown(f"there is no {type} record with hostname {hostname}")
 
     def add(self, record: DNSRecord):
         """
-        Modifies the recordset.
-        If an entry with matching hostname if present, modify it.
-        If no entry is present, create a new one.
+        Appends a new record to the recordset.
         :param record: a new valid dns record
         :return: None
         """
         self.dnsrecords.append(record)
+        self._index(record)
 
+    def diff(self, desired: "DNSRecordSet", full: bool = False) -> "RecordSetDiff":
+        """
+        Compare this (live) set with the desired records, see diff_records.
+        :param desired: DNSRecordSet with the desired records
+        :param full: desired is the complete zone, also compare priorities and delete all other records
+        :return: RecordSetDiff
+        """
+        return diff_records(live=self.dnsrecords, desired=desired, full=full)
+
+    def modify(self, record: DNSRecord, **changes):
+        """
+        Change attributes of a record in this set and keep the index consistent.
+        :param record: a record which is part of this set
+        :param changes: attribute names and their new values
+        :return: None
+        """
+        self._unindex(record)
+        for name, value in changes.items():
+            setattr(record, name, value)
+        self._index(record)
+
+    def remove(self, record: DNSRecord):
+        """
+        Remove a record from the set.
+        :param record: a record which is part of this set
+        :return: None
+        """
+        self._unindex(record)
+        self.dnsrecords[:] = [r for r in self.dnsrecords if r is not record]
 
 
 @dataclass
-class DNSZone(JSONMixin):
+class DNSZone:
     """
     Dataclass for dns zone.
     """
@@ -115,11 +243,21 @@ class DNSZone(JSONMixin):
     expire: int
     dnssecstatus: bool
 
+    def json(self) -> {}:
+        """
+        Return zone as json like dictionary.
+        :return: json like dictionary
+        """
+        return {"name": self.name, "ttl": self.ttl, "serial": self.serial, "refresh": self.refresh,
+                "retry": self.retry, "expire": self.expire, "dnssecstatus": self.dnssecstatus}
+
     def table(self) -> str:
         """
         Nice representation.
         :return: string
         """
+        from tabulate import tabulate
+
         out_table = [
             ["domain", self.name],
             ["ttl", self.ttl],
@@ -129,4 +267,144 @@ class DNSZone(JSONMixin):
             ["expire", self.expire],
             ["dnssec", self.dnssecstatus],
             ]
-        return tabulate(out_table, tablefmt='orgtbl', headers=["zone info", ""])
\ No newline at end of file
+        return tabulate(out_table, tablefmt='orgtbl', headers=["zone info", ""])
+
+
+@dataclass
+class RecordSetDiff:
+    """
+    Difference between the live records of a zone and the desired records.
+    Modified records are kept as (old, new) tuples, new is a copy of the live record (same id) with the desired values.
+    """
+    created: List[DNSRecord] = dataclasses.field(default_factory=list)
+    modified: List[Tuple[DNSRecord, DNSRecord]] = dataclasses.field(default_factory=list)
+    deleted: List[DNSRecord] = dataclasses.field(default_factory=list)
+    unchanged: List[DNSRecord] = dataclasses.field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        """
+        :return: True if anything has to be sent to the api
+        """
+        return bool(self.created or self.modified or self.deleted)
+
+    def changes(self) -> DNSRecordSet:
+        """
+        Only the records which have to be sent to updateDnsRecords, deletions carry the deleterecord flag.
+        :return: DNSRecordSet
+        """
+        return DNSRecordSet(dnsrecords=[*self.created,
+                                        *(new for _, new in self.modified),
+                                        *(dataclasses.replace(r, deleterecord=True) for r in self.deleted)])
+
+    def json(self) -> {}:
+        """
+        Return the changes as json like dictionary, unchanged records are only counted (see from_json).
+        :return: json like dictionary
+        """
+        return {"created":      [record_json(r) for r in self.created],
+                "modified":     [[record_json(old), record_json(new)] for old, new in self.modified],
+                "deleted":      [record_json(r) for r in self.deleted],
+                "unchanged":    len(self.unchanged)}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "RecordSetDiff":
+        """
+        Rebuild a diff exported by json(), without the unchanged records.
+        :param data: json like dictionary
+        :return: RecordSetDiff
+        """
+        return cls(created=[DNSRecord(**r) for r in data["created"]],
+                   modified=[(DNSRecord(**old), DNSRecord(**new)) for old, new in data["modified"]],
+                   deleted=[DNSRecord(**r) for r in data["deleted"]])
+
+    def summary(self) -> dict:
+        """
+        Compact json like representation of the changes, unchanged records are only counted.
+        :return: dictionary
+        """
+        return {"created":      [[r.hostname, r.type, r.destination] for r in self.created],
+                "modified":     [[new.hostname, new.type, old.destination, new.destination]
+                                 for old, new in self.modified],
+                "deleted":      [[r.hostname, r.type, r.destination] for r in self.deleted],
+                "unchanged":    len(self.unchanged)}
+
+    def table(self) -> str:
+        """
+        Nice representation.
+        :return: string
+        """
+        from tabulate import tabulate
+
+        d_table = [["create", r.hostname, r.type, "", r.destination] for r in self.created]
+        d_table += [["modify", new.hostname, new.type, old.destination, new.destination] for old, new in self.modified]
+        d_table += [["delete", r.hostname, r.type, r.destination, ""] for r in self.deleted]
+        return tabulate(d_table, tablefmt="orgtbl", headers=["changes", "", "", "old", "new"])
+
+
+def diff_records(live: Iterable[DNSRecord], desired: DNSRecordSet, full: bool = False) -> RecordSetDiff:
+    """
+    Compute which records have to be created, modified or deleted to get from the live to the desired records.
+    The live records are consumed in a single pass, only those sharing a hostname with a desired record are kept.
+
+    Records are matched by hostname, type and destination first, then by hostname and type (-> modify destination).
+    A CNAME can not coexist with other records, so a remaining record of the same hostname is modified if either of both
+    is a CNAME (-> modify type).
+    Desired records with deleterecord set delete their exact match.
+    :param live: the records currently in the zone (e.g. a DNSRecordSet)
+    :param desired: DNSRecordSet with the desired records
+    :param full: desired is the complete zone, also compare priorities and delete all other records
+    :return: RecordSetDiff
+    """
+    diff = RecordSetDiff()
+
+    # desired records not matched yet
+    exact: Dict[Tuple[str, str, str], List[DNSRecord]] = {}
+    for d in desired:
+        exact.setdefault((d.hostname, d.type, d.destination), []).append(d)
+    hostnames = {d.hostname for d in desired}
+    matched = set()
+
+    # live records not matched exactly, but sharing the hostname with a desired record
+    candidates: Dict[str, List[DNSRecord]] = {}
+
+    for r in live:
+        bucket = exact.get((r.hostname, r.type, r.destination))
+        if bucket:
+            d = bucket.pop(0)
+            matched.add(id(d))
+            if d.deleterecord:
+                diff.deleted.append(r)
+            elif full and r.priority != d.priority:
+                diff.modified.append((r, dataclasses.replace(r, priority=d.priority)))
+            else:
+                diff.unchanged.append(r)
+        elif r.hostname in hostnames:
+            candidates.setdefault(r.hostname, []).append(r)
+        elif full:
+            diff.deleted.append(r)
+
+    for d in desired:
+        if id(d) in matched or d.deleterecord:
+            continue
+
+        same_host = candidates.get(d.hostname, [])
+        old = next((r for r in same_host if r.type == d.type), None)
+        if old is None:
+            old = next((r for r in same_host if "CNAME" in (r.type, d.type)), None)
+
+        if old is None:
+            diff.created.append(d)
+            continue
+
+        same_host.remove(old)
+        changes = {"destination": d.destination, "type": d.type}
+        if full:
+            changes["priority"] = d.priority
+        diff.modified.append((old, dataclasses.replace(old, **changes)))
+
+    if full:
+        for same_host in candidates.values():
+            diff.deleted.extend(same_host)
+
+    return diff
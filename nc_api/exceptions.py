@@ -9,3 +9,23 @@ class RecordUnknown(Exception):
 
 class APIException(Exception):
     pass
+
+
+class SessionExpired(APIException):
+    pass
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class PlanOutdated(Exception):
+    pass
+
+
+class AddressUnknown(Exception):
+    pass
+
+
+class ConfigError(ValueError):
+    pass
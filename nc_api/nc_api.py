@@ -3,37 +3,63 @@ Netcup API implementation.
 """
 
 import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from itertools import chain, islice
+from typing import Callable, Iterator, TypeVar
 
-from requests import Session
+from requests import Response, Session
+from requests.exceptions import ConnectionError, ConnectTimeout, HTTPError, Timeout
 
 from .exceptions import *
 from .dns import DNSRecord, DNSZone, DNSRecordSet
+from .utils.fast_json import HEADERS, dumps, loads
+from .utils.http import DEFAULT_TIMEOUT, TimeoutSession
+from .utils.json_stream import iter_array
+from .utils.metrics import API_ERRORS, API_LATENCY
 
+T = TypeVar("T")
 
-class NcAPI:
+
+@contextmanager
+def api_metrics(action: str):
     """
-    Manage the netcup dns nc_api via requests in a session.
+    Record latency and errors of an api call (the block) in nc_api.utils.metrics.
+    :param action: api action like infoDnsRecords
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except APIException as e:
+        API_ERRORS.inc(action=action, message=str(e))
+        raise
+    except Exception as e:
+        API_ERRORS.inc(action=action, message=type(e).__name__)
+        raise
+    finally:
+        API_LATENCY.observe(time.perf_counter() - start, action=action)
+
+
+class NcAPIBase:
+    """
+    Transport independent part of the api client: credentials, payload construction and response parsing.
+    NcAPI (blocking, requests) and AsyncNcAPI (asyncio, aiohttp) build on this.
     """
 
-    def __init__(self, api_url: str, api_password: str, api_key: str, customer_id: str):
+    def __init__(self, api_url: str, api_password: str, api_key: str, customer_id: str, record_class=DNSRecord):
+        """
+        :param record_class: class of the records read from the api, DNSRecord or CompactDNSRecord
+        """
         self._api_url = api_url
         self._api_key = api_key
         self._api_password = api_password
         self._customer_id = customer_id
+        self._record_class = record_class
 
-        self._session = None
         self._session_id = None
 
-    def __enter__(self):
-        self._login()
-        return self
-
-    def __exit__(self, *args, **kwargs):
-        if self._session_id is not None:
-            self._logout()
-        if self._session is not None:
-            self._session.__exit__(*args, **kwargs)
-
     def nc_request(self, action: str=None, parameters: dict={}) -> dict:
         """
         Construct a valid nc_api request according to https://ccp.netcup.net/run/webservice/servers/endpoint.php.
@@ -57,6 +83,131 @@ class NcAPI:
 
         return payload
 
+    @staticmethod
+    def check_response(response: dict) -> dict:
+        """
+        Raise if the api reports an error.
+        :param response: decoded json response
+        :return: the actual information (responsedata)
+        """
+        if str.lower(response["status"]) != "success":
+            # 4001: the session id is invalid or the session expired
+            if str(response.get("statuscode")) == "4001":
+                raise SessionExpired(response["longmessage"])
+            raise APIException(response["longmessage"])
+
+        # lazy formatting, the response may hold thousands of records
+        logging.debug("request returned success with response %s", response)
+        return response["responsedata"]
+
+    @staticmethod
+    def build_zone(domainname: str, responsedata: dict) -> DNSZone:
+        """
+        Build a DNSZone from the infoDnsZone response.
+        :param domainname: domain name like netcup.de
+        :param responsedata: responsedata of infoDnsZone
+        :return: DNSZone
+        """
+        return DNSZone(name=domainname,
+                       ttl=int(responsedata["ttl"]),
+                       serial=responsedata["serial"],
+                       refresh=int(responsedata["refresh"]),
+                       retry=int(responsedata["retry"]),
+                       expire=int(responsedata["expire"]),
+                       dnssecstatus=responsedata["dnssecstatus"])
+
+    @staticmethod
+    def build_record(r: dict, record_class=DNSRecord) -> DNSRecord:
+        """
+        Build a record from an entry of the infoDnsRecords response.
+        :param r: record dictionary
+        :param record_class: DNSRecord or CompactDNSRecord
+        :return: record
+        """
+        return record_class(id=int(r["id"]),
+                            hostname=r["hostname"],
+                            type=r["type"],
+                            priority=int(r["priority"]),
+                            destination=r["destination"],
+                            deleterecord=r["deleterecord"],
+                            state=r["state"])
+
+    @staticmethod
+    def build_recordset(responsedata: dict, record_class=DNSRecord) -> DNSRecordSet:
+        """
+        Build a DNSRecordSet from the infoDnsRecords response.
+        :param responsedata: responsedata of infoDnsRecords
+        :param record_class: DNSRecord or CompactDNSRecord
+        :return: DNSRecordSet
+        """
+        rset = DNSRecordSet(dnsrecords=[])
+        for r in responsedata["dnsrecords"]:
+            rset.add(NcAPIBase.build_record(r, record_class=record_class))
+
+        return rset
+
+
+class NcAPI(NcAPIBase):
+    """
+    Manage the netcup dns nc_api via requests in a session.
+
+    Transient failures (connection errors, timeouts, http 429 and 5xx) are retried with exponential backoff and full
+    jitter. Reading actions and login/logout are always retried. Updates are retried as well as long as repeating them
+    is harmless, i.e. they only set values. An updateDnsRecords call creating new records (no id) could create them
+    twice, so it is only retried if the connection could not be established at all.
+    """
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self, api_url: str, api_password: str, api_key: str, customer_id: str, session: Session = None,
+                 zone_cache=None, session_cache=None, retries: int = 3, backoff: float = 0.5,
+                 backoff_max: float = 8.0, timeout=DEFAULT_TIMEOUT, record_class=DNSRecord):
+        """
+        :param session: optional requests session to reuse, it is not closed on exit (e.g. for long running processes)
+            a nc_api.utils.http.TimeoutSession also applies its deadline
+        :param zone_cache: optional nc_api.utils.zone_cache.ZoneCache used by infoDnsRecords
+        :param session_cache: optional nc_api.utils.session_cache.SessionCache, keeps the login between runs
+        :param retries: how often a failed request is repeated
+        :param backoff: base delay in seconds, doubled with every attempt
+        :param backoff_max: upper limit for the delay in seconds
+        :param timeout: request timeout in seconds, a number or a (connect, read) tuple
+        :param record_class: class of the records read from the api, CompactDNSRecord saves memory for big zones
+        """
+        super().__init__(api_url=api_url, api_password=api_password, api_key=api_key, customer_id=customer_id,
+                         record_class=record_class)
+
+        self._retries = retries
+        self._backoff = backoff
+        self._backoff_max = backoff_max
+        self._timeout = timeout
+
+        self._session = session
+        self._owns_session = session is None
+        self._zone_cache = zone_cache
+        self._session_cache = session_cache
+        self._session_created = None
+        # zones may be synced from several threads, only one of them should login again
+        self._login_lock = threading.Lock()
+
+    def __enter__(self):
+        if self._session_cache is not None:
+            self._session_id, self._session_created = self._session_cache.load(customer_id=self._customer_id)
+        if self._session_id is None:
+            self._login()
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        if self._session_id is not None:
+            if self._session_cache is not None:
+                # keep the session for the next run instead of logging out
+                self._session_cache.save(customer_id=self._customer_id, session_id=self._session_id,
+                                         created=self._session_created)
+                self._session_id = None
+            else:
+                self._logout()
+        if self._session is not None and self._owns_session:
+            self._session.__exit__(*args, **kwargs)
+            self._session = None
+
     @property
     def session(self) -> Session:
         """
@@ -64,32 +215,112 @@ class NcAPI:
         :return: session object
         """
         if self._session is None:
-            self._session = Session()
+            self._session = TimeoutSession(timeout=self._timeout)
 
         return self._session
 
     def _send(self, payload: dict) -> dict:
         """
         Post nc_api request and raise if an error occured.
+        Latency and errors are recorded in nc_api.utils.metrics.
         :param payload: dictionary of json payload
         :return: request reponse
         """
-        logging.debug(f"posting request with payload {payload}")
-
-        r = self.session.post(url=self._api_url, json=payload)
+        with api_metrics(payload["action"]):
+            return self._send_checked(payload)
 
-        r.raise_for_status()
+    def _send_checked(self, payload: dict) -> dict:
+        """
+        Post nc_api request and check the response, renews an expired cached session.
+        :param payload: dictionary of json payload
+        :return: request reponse
+        """
+        # check if successful and return the actual information
+        return self._renewing(payload, lambda: self.check_response(self._post(payload)))
 
-        response = r.json()
+    def _renewing(self, payload: dict, send: Callable[[], T]) -> T:
+        """
+        Call send, if it raises SessionExpired renew the cached session (see _renew_session) and call it once more.
+        :param payload: dictionary of json payload sent by send, its session id is updated in place
+        :param send: posts the payload and checks the response
+        :return: return value of send
+        """
+        try:
+            return send()
+        except SessionExpired:
+            if self._session_cache is None or payload["action"] in ("login", "logout"):
+                raise
+            self._renew_session(payload)
+            return send()
+
+    def _renew_session(self, payload: dict):
+        """
+        The cached session is gone, login again (unless another thread already did) and update the payload.
+        :param payload: dictionary of json payload which failed with SessionExpired
+        :return: None
+        """
+        with self._login_lock:
+            if payload["param"]["apisessionid"] == self._session_id:
+                logging.info(f"api session expired, logging in again")
+                self._session_cache.clear()
+                self._login()
+        payload["param"]["apisessionid"] = self._session_id
+
+    @staticmethod
+    def _is_idempotent(payload: dict) -> bool:
+        """
+        Check if sending the request twice has the same effect as sending it once.
+        :param payload: dictionary of json payload
+        :return: True if it can be repeated after an unknown outcome
+        """
+        if payload["action"] != "updateDnsRecords":
+            return True
+        return all(r.get("id") is not None for r in payload["param"]["dnsrecordset"]["dnsrecords"])
 
-        # check if successful
-        if str.lower(response["status"]) != "success":
-            self.__exit__()
-            raise APIException(response["longmessage"])
+    def _post(self, payload: dict) -> dict:
+        """
+        Post nc_api request, transient errors are retried (see class docstring).
+        :param payload: dictionary of json payload
+        :return: decoded json response
+        """
+        return loads(self._request(payload).content)
 
-        # return the actual information
-        logging.debug(f"request returned success with response {response}")
-        return response["responsedata"]
+    def _request(self, payload: dict, stream: bool = False) -> Response:
+        """
+        Post nc_api request, transient errors are retried (see class docstring).
+        :param payload: dictionary of json payload
+        :param stream: do not read the body yet (see requests), close the response when done
+        :return: successful response
+        """
+        logging.debug("posting request with payload %s", payload)
+
+        action = payload["action"]
+        # encode once, retries send the same bytes
+        body = dumps(payload)
+        idempotent = self._is_idempotent(payload)
+        attempt = 0
+        while True:
+            attempt += 1
+            start = time.perf_counter()
+            try:
+                r = self.session.post(url=self._api_url, data=body, headers=HEADERS, timeout=self._timeout,
+                                      stream=stream)
+                r.raise_for_status()
+                logging.debug(f"{action} attempt {attempt} took {time.perf_counter() - start:.3f}s")
+                return r
+            except (ConnectionError, Timeout, HTTPError) as e:
+                logging.debug(f"{action} attempt {attempt} failed after {time.perf_counter() - start:.3f}s: {e}")
+                if isinstance(e, HTTPError):
+                    retry = e.response is not None and e.response.status_code in self.RETRY_STATUS and idempotent
+                else:
+                    # without a connection the request never reached the api
+                    retry = idempotent or isinstance(e, ConnectTimeout)
+                if not retry or attempt > self._retries:
+                    raise
+
+            delay = random.uniform(0, min(self._backoff_max, self._backoff * 2 ** (attempt - 1)))
+            logging.warning(f"{action} failed (attempt {attempt}), retrying in {delay:.2f}s")
+            time.sleep(delay)
 
     def _login(self):
         """
@@ -99,6 +330,7 @@ class NcAPI:
         data = self._send(self.nc_request(action="login", parameters={"apipassword": self._api_password}))
 
         self._session_id = data["apisessionid"]
+        self._session_created = time.time()
 
         logging.info(f"logged in successfully with session id {self._session_id}")
 
@@ -119,40 +351,88 @@ class NcAPI:
         """
         response = self._send(self.nc_request(action="infoDnsZone", parameters={"domainname": domainname}))
 
-        # build zone
-        zone = DNSZone(name=domainname,
-                       ttl=int(response["ttl"]),
-                       serial=response["serial"],
-                       refresh=int(response["refresh"]),
-                       retry=int(response["retry"]),
-                       expire=int(response["expire"]),
-                       dnssecstatus=response["dnssecstatus"])
+        return self.build_zone(domainname=domainname, responsedata=response)
 
-        return zone
-
-    def infoDnsRecords(self, domainname: str) -> DNSRecordSet:
+    def infoDnsRecords(self, domainname: str, serial: str = None) -> DNSRecordSet:
         """
         Returns information in the dns records (aka host entries) of given domain.
+        If a zone cache is configured and the current zone serial is given, unchanged zones are read from the cache.
         :param domainname: domain name like netcup.de
+        :param serial: current zone serial (see infoDnsZone), optional
         :return: DNSRecordSet
         """
+        use_cache = self._zone_cache is not None and serial is not None
+        if use_cache:
+            rset = self._zone_cache.get(domainname=domainname, serial=serial, record_class=self._record_class)
+            if rset is not None:
+                return rset
+
         response = self._send(self.nc_request(action="infoDnsRecords", parameters={"domainname": domainname}))
 
-        # build records
-        rset = DNSRecordSet(dnsrecords=[])
-        for r in response["dnsrecords"]:
-            dr = DNSRecord(id=int(r["id"]),
-                           hostname=r["hostname"],
-                           type=r["type"],
-                           priority=int(r["priority"]),
-                           destination=r["destination"],
-                           deleterecord=r["deleterecord"],
-                           state=r["state"])
+        rset = self.build_recordset(responsedata=response, record_class=self._record_class)
 
-            rset.dnsrecords.append(dr)
+        if use_cache:
+            self._zone_cache.put(domainname=domainname, serial=serial, recordset=rset)
 
         return rset
 
+    def iterDnsRecords(self, domainname: str, serial: str = None, chunk_size: int = 1 << 16) -> Iterator[DNSRecord]:
+        """
+        Like infoDnsRecords, but yields the records while the response is still being received, without holding the
+        response (or all records) in memory. Useful for huge zones, e.g. with diff_records.
+        Unchanged zones are read from the zone cache (see infoDnsRecords). On a cache miss the records are collected
+        to fill the cache, so memory is only bounded without a zone cache.
+        :param domainname: domain name like netcup.de
+        :param serial: current zone serial (see infoDnsZone), optional
+        :param chunk_size: bytes read from the connection at once
+        :return: iterator of records
+        """
+        use_cache = self._zone_cache is not None and serial is not None
+        if use_cache:
+            rset = self._zone_cache.get(domainname=domainname, serial=serial, record_class=self._record_class)
+            if rset is not None:
+                yield from rset
+                return
+
+        payload = self.nc_request(action="infoDnsRecords", parameters={"domainname": domainname})
+        rset = DNSRecordSet(dnsrecords=[]) if use_cache else None
+        with api_metrics("infoDnsRecords"):
+            for r in self._stream_records(payload, chunk_size=chunk_size):
+                record = self.build_record(r, record_class=self._record_class)
+                if rset is not None:
+                    rset.add(record)
+                yield record
+
+        if rset is not None:
+            self._zone_cache.put(domainname=domainname, serial=serial, recordset=rset)
+
+    def _stream_records(self, payload: dict, chunk_size: int) -> Iterator[dict]:
+        """
+        Post infoDnsRecords and parse the records incrementally, renews an expired cached session.
+        :param payload: dictionary of json payload
+        :param chunk_size: bytes read from the connection at once
+        :return: iterator of record dictionaries
+        """
+        def records(response: dict) -> list:
+            # no dnsrecords array, e.g. an error (check_response raises) or an empty zone
+            responsedata = self.check_response(response)
+            return responsedata["dnsrecords"] if responsedata else []
+
+        def send() -> tuple:
+            r = self._request(payload, stream=True)
+            try:
+                items = iter_array(r.iter_content(chunk_size=chunk_size), key="dnsrecords", fallback=records)
+                # an error response (e.g. SessionExpired) raises before the first record
+                first = list(islice(items, 1))
+            except BaseException:
+                r.close()
+                raise
+            return r, chain(first, items)
+
+        r, items = self._renewing(payload, send)
+        with r:
+            yield from items
+
     def updateDnsZone(self, zone: DNSZone):
         """
         Update/change the given dns zone.
@@ -171,3 +451,5 @@ class NcAPI:
         """
         self._send(self.nc_request(action="updateDnsRecords",
                                    parameters={"domainname": zone.name, "dnsrecordset": recordset.json()}))
+        if self._zone_cache is not None:
+            self._zone_cache.invalidate(domainname=zone.name)
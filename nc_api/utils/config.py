@@ -0,0 +1,190 @@
+"""
+Loader for the hosts file (see hosts.json.sample), parsed once and validated before any network request.
+"""
+
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from ipaddress import AddressValueError, IPv4Address, IPv6Address
+from typing import List
+
+from ..exceptions import ConfigError
+
+# record types supported by netcup
+RECORD_TYPES = ("A", "AAAA", "MX", "CNAME", "CAA", "SRV", "TXT", "TLSA", "NS", "DS", "OPENPGPKEY", "SMIMEA", "SSHFP")
+
+# types which get the external ip if no destination is given
+DYNAMIC_TYPES = ("A", "AAAA")
+
+HOSTNAME = re.compile(r"^(@|[A-Za-z0-9_*-]+(\.[A-Za-z0-9_-]+)*)$")
+
+HOST_KEYS = ("hostname", "type", "destination", "priority", "deleterecord")
+
+
+@dataclass
+class Host:
+    """
+    A host entry, destination None means the external ip.
+    """
+    hostname: str
+    type: str
+    destination: str = None
+    priority: int = 0
+    deleterecord: bool = False
+
+
+@dataclass
+class Zone:
+    domainname: str
+    hosts: List[Host]
+
+
+@dataclass
+class HostsConfig:
+    """
+    All zones of a hosts file and the hash of its content (see digest).
+    """
+    zones: List[Zone]
+    content_hash: object = field(default=None, repr=False, compare=False)
+
+    @property
+    def needs_ip(self) -> bool:
+        """
+        :return: True if a host has no destination, i.e. the external ip has to be looked up
+        """
+        return any(h.destination is None for z in self.zones for h in z.hosts)
+
+    def digest(self, ttl: int = None) -> str:
+        """
+        Hash of the file content and the requested ttl, used to detect config changes (see PublishState).
+        :param ttl: requested zone ttl or None
+        :return: hex digest
+        """
+        h = self.content_hash.copy()
+        h.update(f"ttl={ttl}".encode())
+        return h.hexdigest()
+
+
+def decode_json(content: bytes, source: str) -> dict:
+    """
+    Decode json, syntax errors are reported with line and column.
+    :param content: raw file content
+    :param source: file name used in error messages
+    :return: decoded object
+    """
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError as e:
+        raise ConfigError(f"{source}:{e.lineno}:{e.colno}: {e.msg}")
+    except UnicodeDecodeError as e:
+        raise ConfigError(f"{source}: {e}")
+
+
+def _fail(source: str, path: str, message: str):
+    raise ConfigError(f"{source}: {path}: {message}")
+
+
+def _parse_host(source: str, path: str, h) -> Host:
+    if not isinstance(h, dict):
+        _fail(source, path, f"expected an object, got {type(h).__name__}")
+    unknown = sorted(set(h) - set(HOST_KEYS))
+    if unknown:
+        _fail(source, f"{path}.{unknown[0]}", f"unknown key, expected one of {', '.join(HOST_KEYS)}")
+
+    for key in ("hostname", "type"):
+        if key not in h:
+            _fail(source, path, f"'{key}' is missing")
+    hostname, type_ = h["hostname"], h["type"]
+    if not isinstance(hostname, str) or not HOSTNAME.match(hostname):
+        _fail(source, f"{path}.hostname", f"invalid hostname {hostname!r}")
+    if type_ not in RECORD_TYPES:
+        _fail(source, f"{path}.type", f"unknown record type {type_!r}, expected one of {', '.join(RECORD_TYPES)}")
+
+    destination = h.get("destination")
+    if destination is None:
+        if "destination" in h or type_ not in DYNAMIC_TYPES:
+            _fail(source, f"{path}.destination", f"required for {type_} records")
+    elif not isinstance(destination, str) or not destination:
+        _fail(source, f"{path}.destination", f"expected a non empty string, got {destination!r}")
+    elif type_ in DYNAMIC_TYPES:
+        try:
+            IPv4Address(destination) if type_ == "A" else IPv6Address(destination)
+        except AddressValueError:
+            _fail(source, f"{path}.destination", f"{destination!r} is no ipv{4 if type_ == 'A' else 6} address")
+
+    priority = h.get("priority", 0)
+    if isinstance(priority, str) and priority.isdigit():
+        # the api itself returns priorities as strings
+        priority = int(priority)
+    if not isinstance(priority, int) or isinstance(priority, bool) or priority < 0:
+        _fail(source, f"{path}.priority", f"expected a non negative integer, got {priority!r}")
+
+    deleterecord = h.get("deleterecord", False)
+    if not isinstance(deleterecord, bool):
+        _fail(source, f"{path}.deleterecord", f"expected true or false, got {deleterecord!r}")
+
+    return Host(hostname=hostname, type=type_, destination=destination, priority=priority,
+                deleterecord=deleterecord)
+
+
+def _parse_zone(source: str, path: str, domainname, hosts) -> Zone:
+    if not isinstance(domainname, str) or "." not in domainname or not HOSTNAME.match(domainname):
+        _fail(source, f"{path}.domainname", f"invalid domain name {domainname!r}")
+    if not isinstance(hosts, list):
+        _fail(source, f"{path}.hosts", f"expected a list, got {type(hosts).__name__}")
+    return Zone(domainname=domainname,
+                hosts=[_parse_host(source, f"{path}.hosts[{i}]", h) for i, h in enumerate(hosts)])
+
+
+def parse_hosts(content: bytes, source: str = "<hosts>", config: dict = None) -> HostsConfig:
+    """
+    Validate a hosts file. Either a single 'zone' with a 'hosts' section or a list of 'zones' (each with 'domainname'
+    and 'hosts') is accepted.
+    :param content: raw file content
+    :param source: file name used in error messages
+    :param config: the already decoded content, if available
+    :return: HostsConfig
+    :raises ConfigError: pointing to the first invalid entry, e.g. "hosts.json: zones[0].hosts[2].type: ..."
+    """
+    if config is None:
+        config = decode_json(content, source)
+    if not isinstance(config, dict):
+        _fail(source, "$", "expected an object")
+
+    if "zones" in config:
+        if not isinstance(config["zones"], list):
+            _fail(source, "zones", "expected a list")
+        zones = []
+        for i, z in enumerate(config["zones"]):
+            if not isinstance(z, dict):
+                _fail(source, f"zones[{i}]", "expected an object")
+            for key in ("domainname", "hosts"):
+                if key not in z:
+                    _fail(source, f"zones[{i}]", f"'{key}' is missing")
+            zones.append(_parse_zone(source, f"zones[{i}]", z["domainname"], z["hosts"]))
+    else:
+        if not isinstance(config.get("zone"), dict) or "domainname" not in config["zone"]:
+            _fail(source, "zone.domainname", "'zone' with 'domainname' (or a list of 'zones') is missing")
+        if "hosts" not in config:
+            _fail(source, "hosts", "'hosts' is missing")
+        zones = [_parse_zone(source, "zone", config["zone"]["domainname"], config["hosts"])]
+
+    seen = set()
+    for i, z in enumerate(zones):
+        if z.domainname in seen:
+            _fail(source, f"zones[{i}].domainname", f"{z.domainname} is listed twice")
+        seen.add(z.domainname)
+
+    return HostsConfig(zones=zones, content_hash=hashlib.sha256(content))
+
+
+def load_hosts(filename: str) -> HostsConfig:
+    """
+    Read and validate a hosts file, see parse_hosts.
+    :param filename: where the hosts file is located
+    :return: HostsConfig
+    """
+    with open(filename, "rb") as fp:
+        content = fp.read()
+    return parse_hosts(content, source=filename)
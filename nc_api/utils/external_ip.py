@@ -2,25 +2,49 @@
 Helper to get the external ip.
 """
 
-from ipaddress import IPv4Address, AddressValueError
-from requests.exceptions import ConnectionError
-from fritzconnection.lib.fritzstatus import FritzStatus
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+from ipaddress import IPv4Address, IPv6Address, AddressValueError, ip_address
+from typing import NamedTuple, Union
+from requests.exceptions import ConnectionError, Timeout
 
 import logging
+import socket
+import time
 
-from requests import get
+from requests import Session, get
+
+from .http import DEFAULT_TIMEOUT
+from .metrics import IP_LOOKUP_LATENCY
+from .netlink import interface_addresses
+
+IPAddress = Union[IPv4Address, IPv6Address]
+
+
+class Addresses(NamedTuple):
+    """
+    External addresses of both families, either may be None.
+    """
+    ipv4: IPv4Address = None
+    ipv6: IPv6Address = None
+
+    def __str__(self):
+        return ", ".join(str(a) for a in self if a is not None)
 
 
 class ExternalIP:
     """
     Base class.
     Do not use this directly, instead inherit and implement!
+    The version attribute tells which address family (4 or 6) the ip property returns.
     """
+    version = 4
+
     def __init__(self):
         pass
 
     @property
-    def ip(self) -> IPv4Address:
+    def ip(self) -> IPAddress:
         """
         Implement this method as a property.
         :return:
@@ -28,44 +52,199 @@ class ExternalIP:
         raise NotImplementedError
 
 
-class ExternalIpify(ExternalIP):
+class ExternalHTTP(ExternalIP):
     """
-    This implementation uses the https://www.ipify.org/ API.
+    This implementation uses any http service answering with the plain ip address (like ipify or icanhazip).
     """
-    API_URL = "https://api.ipify.org"
+    API_URL = None
+
+    def __init__(self, url: str = None, version: int = 4, session: Session = None, timeout=DEFAULT_TIMEOUT):
+        """
+        :param url: service url, defaults to API_URL
+        :param version: 4 or 6
+        :param session: optional (pooled) requests session
+        :param timeout: request timeout in seconds, a number or a (connect, read) tuple
+        """
+        self.url = url if url is not None else self.API_URL
+        self.version = version
+        self.session = session
+        self.timeout = timeout
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.url})"
 
     @property
-    def ip(self) -> IPv4Address:
-        r = get(self.API_URL)
+    def ip(self) -> IPAddress:
+        r = (self.session.get if self.session is not None else get)(self.url, timeout=self.timeout)
 
         # raise if request unsuccessful
         r.raise_for_status()
 
-        ip = IPv4Address(r.text)
+        ip = ip_address(r.text.strip())
+        if ip.version != self.version:
+            raise AddressValueError(f"{self.url} answered with {ip}, expected an ipv{self.version} address")
         logging.debug(f"found external ip to be {ip}")
         return ip
 
 
+class ExternalIpify(ExternalHTTP):
+    """
+    This implementation uses the https://www.ipify.org/ API.
+    """
+    API_URL = "https://api.ipify.org"
+    API_URL_V6 = "https://api6.ipify.org"
+
+    def __init__(self, version: int = 4, session: Session = None, timeout=DEFAULT_TIMEOUT):
+        super().__init__(url=self.API_URL_V6 if version == 6 else self.API_URL, version=version, session=session,
+                         timeout=timeout)
+
+
 class ExternalFritzbox(ExternalIP):
     """
     This implementation uses the FRITZ!Box API (TR-064 protocol over UPnP).
+    fritzconnection is imported on first use, runs without a FRITZ!Box do not pay for it.
     """
     fritzbox_ip = ""
 
-    def __init__(self, fritzbox_ip):
+    def __init__(self, fritzbox_ip, version: int = 4, timeout: float = DEFAULT_TIMEOUT[1]):
         self.fritzbox_ip = fritzbox_ip
+        self.version = version
+        self.timeout = timeout
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.fritzbox_ip}, ipv{self.version})"
 
     @property
-    def ip(self) -> IPv4Address:
+    def ip(self) -> IPAddress:
+        from fritzconnection import FritzConnection
+        from fritzconnection.lib.fritzstatus import FritzStatus
+
         try:
-            fc = FritzStatus(address=self.fritzbox_ip)
-            ip = IPv4Address(fc.external_ip)
+            fc = FritzStatus(fc=FritzConnection(address=self.fritzbox_ip, timeout=self.timeout))
+            if self.version == 6:
+                ip = IPv6Address(fc.external_ipv6)
+            else:
+                ip = IPv4Address(fc.external_ip)
         except AddressValueError:
             logging.error(f"unable to get external ip from FRITZ!Box {self.fritzbox_ip}")
             return None
-        except ConnectionError:
+        except (ConnectionError, Timeout):
             logging.error(f"unable to connect to FRITZ!Box {self.fritzbox_ip}")
             return None
 
         logging.debug(f"found external ip to be {ip}")
         return ip
+
+
+class ExternalInterface(ExternalIP):
+    """
+    This implementation reads the global address of a local network interface via netlink (Linux only).
+    Use it for the interface facing the internet: with ipv6 (no NAT) or a router/modem in bridge mode this is the
+    address the host is reachable at.
+    """
+    # address flags to skip: temporary (privacy extension), deprecated, tentative
+    SKIP_FLAGS = 0x01 | 0x20 | 0x40
+
+    def __init__(self, interface: str, version: int = 6):
+        self.interface = interface
+        self.version = version
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.interface}, ipv{self.version})"
+
+    @property
+    def ip(self) -> IPAddress:
+        family = socket.AF_INET6 if self.version == 6 else socket.AF_INET
+        for ip, flags, _ in interface_addresses(self.interface, family=family):
+            if not flags & self.SKIP_FLAGS and ip.is_global:
+                logging.debug(f"found external ip to be {ip}")
+                return ip
+
+        logging.error(f"no global ipv{self.version} address on interface {self.interface}")
+        return None
+
+
+class ExternalRace(ExternalIP):
+    """
+    This implementation asks several sources at the same time.
+    The first answer wins, unless a quorum is required: then the first address reported by quorum sources wins.
+    Sources which fail or do not answer within the deadline are ignored.
+    """
+
+    def __init__(self, sources: list, deadline: float = 10.0, quorum: int = 1):
+        """
+        :param sources: list of ExternalIP instances
+        :param deadline: seconds to wait for (enough) answers
+        :param quorum: number of sources which have to agree on the address
+        """
+        assert 1 <= quorum <= len(sources), "quorum has to be between 1 and the number of sources!"
+        assert len({source.version for source in sources}) == 1, "all sources have to use the same ip version!"
+        self.sources = sources
+        self.version = sources[0].version
+        self.deadline = deadline
+        self.quorum = quorum
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(map(repr, self.sources))}, quorum={self.quorum})"
+
+    @staticmethod
+    def _ask(source: ExternalIP):
+        start = time.perf_counter()
+        try:
+            return source.ip
+        except Exception as e:
+            logging.debug(f"{source} failed: {e}")
+            return None
+        finally:
+            IP_LOOKUP_LATENCY.observe(time.perf_counter() - start, source=repr(source))
+
+    @property
+    def ip(self) -> IPAddress:
+        votes = Counter()
+        executor = ThreadPoolExecutor(max_workers=len(self.sources))
+        futures = {executor.submit(self._ask, source): source for source in self.sources}
+        try:
+            for future in as_completed(futures, timeout=self.deadline):
+                ip = future.result()
+                if ip is None:
+                    continue
+                votes[ip] += 1
+                logging.debug(f"{futures[future]} reported {ip} ({votes[ip]}/{self.quorum})")
+                if votes[ip] >= self.quorum:
+                    return ip
+        except TimeoutError:
+            logging.error(f"no external ip within {self.deadline}s")
+        finally:
+            # do not wait for slow sources
+            executor.shutdown(wait=False)
+
+        if votes:
+            logging.error(f"sources did not agree on the external ip: {dict(votes)}")
+        return None
+
+
+def _lookup(resolver: ExternalIP) -> IPAddress:
+    """
+    Address of one family, a race observes the latency of its sources itself (see ExternalRace._ask).
+    :param resolver: ExternalIP
+    :return: the address or None
+    """
+    if isinstance(resolver, ExternalRace):
+        return resolver.ip
+    return ExternalRace._ask(resolver)
+
+
+def find_addresses(ipv4: ExternalIP = None, ipv6: ExternalIP = None) -> Addresses:
+    """
+    Look up the external addresses of both families at the same time.
+    :param ipv4: resolver for the ipv4 address or None to skip it
+    :param ipv6: resolver for the ipv6 address or None to skip it
+    :return: Addresses, a family is None if skipped or not found
+    """
+    resolvers = [r for r in (ipv4, ipv6) if r is not None]
+    if not resolvers:
+        return Addresses()
+
+    with ThreadPoolExecutor(max_workers=len(resolvers)) as executor:
+        futures = [executor.submit(_lookup, r) if r is not None else None for r in (ipv4, ipv6)]
+        return Addresses(*(f.result() if f is not None else None for f in futures))
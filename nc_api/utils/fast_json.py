@@ -0,0 +1,37 @@
+"""
+json encoding and decoding of api payloads, uses orjson if it is installed (pip install orjson) and falls back to the
+standard library otherwise.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+HEADERS = {"Content-Type": "application/json"}
+
+
+def dumps(obj) -> bytes:
+    """
+    Encode to compact json.
+    :param obj: json like object
+    :return: utf-8 encoded json
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def loads(data: bytes):
+    """
+    Decode json.
+    :param data: utf-8 encoded json
+    :return: json like object
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,76 @@
+"""
+Shared http session with connection pooling, default timeouts and an optional overall deadline.
+"""
+
+import time
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+
+from ..exceptions import DeadlineExceeded
+
+# (connect, read) timeout in seconds
+DEFAULT_TIMEOUT = (5.0, 30.0)
+
+
+class Deadline:
+    """
+    Point in time after which no further requests should be started.
+    """
+
+    def __init__(self, seconds: float = None):
+        """
+        :param seconds: time from now, None for no deadline
+        """
+        self.expires = time.monotonic() + seconds if seconds is not None else None
+
+    def remaining(self) -> float:
+        """
+        :return: seconds left (may be negative) or None if there is no deadline
+        """
+        if self.expires is None:
+            return None
+        return self.expires - time.monotonic()
+
+    def check(self):
+        """
+        Raise if the deadline passed.
+        :return: None
+        """
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(f"deadline exceeded by {-remaining:.1f}s")
+
+
+class TimeoutSession(Session):
+    """
+    requests session which applies a default timeout to every request and caps it by the deadline (if any).
+    The connections are pooled (keep-alive), one instance can be shared by the api client and the ip resolvers.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, pool_maxsize: int = 10, deadline: Deadline = None):
+        """
+        :param timeout: default timeout in seconds, a number or a (connect, read) tuple
+        :param pool_maxsize: connections kept per host, should be at least the number of parallel requests
+        :param deadline: optional Deadline, can also be set later via the deadline attribute
+        """
+        super().__init__()
+        self.timeout = timeout
+        self.deadline = deadline if deadline is not None else Deadline()
+
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        timeout = kwargs.pop("timeout", None) or self.timeout
+
+        remaining = self.deadline.remaining()
+        if remaining is not None:
+            self.deadline.check()
+            if isinstance(timeout, tuple):
+                timeout = tuple(min(t, remaining) for t in timeout)
+            else:
+                timeout = min(timeout, remaining)
+
+        return super().request(method, url, *args, timeout=timeout, **kwargs)
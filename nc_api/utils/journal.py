@@ -0,0 +1,109 @@
+"""
+Append only journal of all published record changes, kept in a SQLite database.
+"""
+
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS changes (
+    id              INTEGER PRIMARY KEY,
+    time            REAL NOT NULL,
+    zone            TEXT NOT NULL,
+    serial          TEXT,
+    hostname        TEXT NOT NULL,
+    type            TEXT NOT NULL,
+    change          TEXT NOT NULL,
+    old_type        TEXT,
+    old_destination TEXT,
+    new_destination TEXT,
+    priority        INTEGER,
+    latency         REAL
+);
+CREATE INDEX IF NOT EXISTS changes_hostname_time ON changes (hostname, time);
+CREATE INDEX IF NOT EXISTS changes_zone_time ON changes (zone, time);
+CREATE INDEX IF NOT EXISTS changes_time ON changes (time);
+"""
+
+COLUMNS = ("time", "zone", "serial", "hostname", "type", "change", "old_type", "old_destination", "new_destination",
+           "priority", "latency")
+
+
+class Journal:
+    """
+    One row per created, modified or deleted record. Rows are only ever inserted, history() reads them using the
+    indexes on (hostname, time), (zone, time) and time.
+    """
+
+    def __init__(self, filename: str):
+        # imported on first use, runs without a journal do not pay for it
+        import sqlite3
+
+        self.filename = filename
+        # zones are synced from several threads, they share the connection
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(filename, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock, self._db:
+            self._db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def close(self):
+        self._db.close()
+
+    def record(self, zone: str, serial: str, diff, latency: float = None, when: float = None):
+        """
+        Append the changes of one updateDnsRecords call.
+        :param zone: domain name like example.com
+        :param serial: zone serial the changes were based on (before the update)
+        :param diff: the published nc_api.RecordSetDiff
+        :param latency: seconds the api call took
+        :param when: unix time, defaults to now
+        :return: None
+        """
+        when = time.time() if when is None else when
+        rows = [(when, zone, serial, r.hostname, r.type, "create", None, None, r.destination, r.priority, latency)
+                for r in diff.created]
+        rows += [(when, zone, serial, new.hostname, new.type, "modify", old.type, old.destination, new.destination,
+                  new.priority, latency) for old, new in diff.modified]
+        rows += [(when, zone, serial, r.hostname, r.type, "delete", r.type, r.destination, None, r.priority, latency)
+                 for r in diff.deleted]
+        if not rows:
+            return
+        with self._lock, self._db:
+            self._db.executemany(f"INSERT INTO changes ({', '.join(COLUMNS)}) "
+                                 f"VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+
+    def history(self, hostname: str = None, zone: str = None, since: float = None, until: float = None,
+                limit: int = None) -> list:
+        """
+        Query the journal, newest changes first.
+        :param hostname: only changes of this hostname
+        :param zone: only changes of this zone
+        :param since: unix time, only changes at or after it
+        :param until: unix time, only changes before it
+        :param limit: maximum number of changes
+        :return: list of dictionaries with the keys in COLUMNS
+        """
+        conditions, parameters = [], []
+        for column, operator, value in (("hostname", "=", hostname), ("zone", "=", zone), ("time", ">=", since),
+                                        ("time", "<", until)):
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                parameters.append(value)
+
+        query = f"SELECT {', '.join(COLUMNS)} FROM changes"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY time DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters.append(limit)
+
+        with self._lock:
+            return [dict(row) for row in self._db.execute(query, parameters)]
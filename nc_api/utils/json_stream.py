@@ -0,0 +1,87 @@
+"""
+Incremental parsing of a json array inside a (large) json document, e.g. the dnsrecords of an infoDnsRecords response.
+"""
+
+import codecs
+import json
+import re
+from typing import Callable, Iterable, Iterator
+
+WHITESPACE = " \t\r\n,"
+
+# api responses carry the status before the responsedata
+STATUS = re.compile(r'"status"\s*:\s*"(\w*)"')
+
+# drop parsed items from the buffer once this many characters are consumed
+COMPACT_AT = 1 << 16
+
+
+def iter_array(chunks: Iterable[bytes], key: str, fallback: Callable[[dict], Iterable]) -> Iterator:
+    """
+    Yield the items of the array stored under key as soon as they are complete, the rest of the document is skipped.
+    If the document has no such array (e.g. an error response) or its status is not "success", the whole document is
+    decoded and passed to fallback, whose return value is yielded from instead.
+    :param chunks: utf-8 encoded document in pieces, e.g. requests' Response.iter_content()
+    :param key: name of the array, its first occurrence is used
+    :param fallback: called with the decoded document if the array is not found, returns the items (or raises)
+    :return: iterator of the decoded items
+    """
+    chunks = iter(chunks)
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    decoder = json.JSONDecoder()
+    marker = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    buf = ""
+
+    def more() -> bool:
+        nonlocal buf
+        chunk = next(chunks, None)
+        if chunk is None:
+            buf += utf8.decode(b"", final=True)
+            return False
+        buf += utf8.decode(chunk)
+        return True
+
+    # find the start of the array
+    while True:
+        found = marker.search(buf)
+        if found is not None:
+            break
+        if not more():
+            yield from fallback(json.loads(buf))
+            return
+
+    status = STATUS.search(buf, 0, found.start())
+    if status is not None and status.group(1).lower() != "success":
+        while more():
+            pass
+        yield from fallback(json.loads(buf))
+        return
+
+    pos = found.end()
+    while True:
+        while True:
+            while pos < len(buf) and buf[pos] in WHITESPACE:
+                pos += 1
+            if pos < len(buf) or not more():
+                break
+        if pos >= len(buf):
+            raise ValueError(f"document ended inside the {key} array")
+
+        if buf[pos] == "]":
+            # skip the rest, so the connection can be reused
+            for _ in chunks:
+                pass
+            return
+
+        try:
+            item, pos = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # incomplete item, wait for the next chunk
+            if more():
+                continue
+            raise
+        yield item
+
+        if pos > COMPACT_AT:
+            buf = buf[pos:]
+            pos = 0
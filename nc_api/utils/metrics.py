@@ -0,0 +1,217 @@
+"""
+Tiny metrics registry rendering the Prometheus text format (version 0.0.4), without further dependencies.
+Expose it via http (start_http_server, for daemon mode) or write it for the node exporter's textfile collector
+(write_textfile, for oneshot runs).
+"""
+
+import os
+import threading
+import time
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric:
+    """
+    Base class, a metric has a name, a help text and optionally label names.
+    """
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        assert set(labels) == set(self.labelnames), f"{self.name} needs the labels {self.labelnames}"
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _samples(self):
+        """
+        :return: iterable of (suffix, labels dictionary, value)
+        """
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield "", dict(zip(self.labelnames, key)), value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {_escape_help(self.documentation)}", f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing value.
+    """
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    Value which can go up and down, or is computed when rendered (set_function).
+    """
+    type = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._function = None
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels))
+
+    def set_function(self, function):
+        """
+        Compute the (label less) value when rendering, the function may return None to omit the sample.
+        :param function: callable without arguments
+        :return: None
+        """
+        self._function = function
+
+    def _samples(self):
+        if self._function is not None:
+            value = self._function()
+            if value is not None:
+                yield "", {}, value
+            return
+        yield from super()._samples()
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values (e.g. latencies) in cumulative buckets.
+    """
+    type = "histogram"
+    DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, *args, buckets: tuple = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, (list(counts), total)) for key, (counts, total) in self._values.items()]
+        for key, (counts, total) in items:
+            labels = dict(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, counts):
+                yield "_bucket", {**labels, "le": _format_value(bound)}, count
+            yield "_sum", labels, total
+            yield "_count", labels, counts[-1]
+
+
+class Registry:
+    """
+    Collection of metrics.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: Metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """
+        :return: all metrics in Prometheus text format
+        """
+        return "\n".join(m.render() for m in self._metrics) + "\n"
+
+
+def write_textfile(filename: str, registry: Registry = None):
+    """
+    Write the metrics atomically, e.g. into the directory of the node exporter's textfile collector.
+    :param filename: target file, should end with .prom
+    :param registry: defaults to REGISTRY
+    :return: None
+    """
+    tmp = f"{filename}.{os.getpid()}.tmp"
+    with open(tmp, "w") as fp:
+        fp.write((registry if registry is not None else REGISTRY).render())
+    os.replace(tmp, filename)
+
+
+def start_http_server(port: int, address: str = "127.0.0.1", registry: Registry = None):
+    """
+    Serve the metrics on http://address:port/metrics in a background thread.
+    :param port: tcp port
+    :param address: address to bind to
+    :param registry: defaults to REGISTRY
+    :return: the server (http.server.ThreadingHTTPServer)
+    """
+    # http.server pulls in the email package, only load it in daemon mode
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    registry = registry if registry is not None else REGISTRY
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((address, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+REGISTRY = Registry()
+
+API_LATENCY = Histogram("netcup_api_request_seconds", "Latency of netcup api requests including retries.", ["action"])
+API_ERRORS = Counter("netcup_api_errors_total", "Failed netcup api requests by error message.", ["action", "message"])
+IP_LOOKUP_LATENCY = Histogram("dyndns_ip_lookup_seconds", "Latency of external ip lookups per source.", ["source"])
+RECORDS_CHANGED = Counter("dyndns_records_changed_total", "Records created, modified or deleted.", ["zone", "change"])
+LAST_PUBLISH = Gauge("dyndns_last_publish_timestamp_seconds", "Unix time of the last successful publish.")
+SINCE_PUBLISH = Gauge("dyndns_seconds_since_last_publish", "Seconds since the last successful publish.")
+SINCE_PUBLISH.set_function(lambda: time.time() - LAST_PUBLISH.get() if LAST_PUBLISH.get() is not None else None)
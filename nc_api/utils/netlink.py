@@ -0,0 +1,220 @@
+"""
+Minimal rtnetlink client (Linux only): read interface addresses and wait for address, route or link changes.
+Only the standard library is used, the messages are parsed with struct.
+"""
+
+import errno
+import logging
+import select
+import socket
+import struct
+import time
+from ipaddress import ip_address
+
+NETLINK_ROUTE = 0
+
+# multicast groups
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+RTMGRP_IPV6_IFADDR = 0x100
+RTMGRP_IPV6_ROUTE = 0x400
+
+# message types
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+RTM_GETADDR = 22
+RTM_NEWROUTE = 24
+RTM_DELROUTE = 25
+
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+
+# attributes
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFA_FLAGS = 8
+RTA_OIF = 4
+
+NLMSGHDR = struct.Struct("=LHHLL")
+IFADDRMSG = struct.Struct("=BBBBI")
+IFINFOMSG = struct.Struct("=BxHiII")
+RTMSG = struct.Struct("=BBBBBBBBI")
+RTATTR = struct.Struct("=HH")
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def _messages(data: bytes):
+    """
+    Split a netlink datagram into (type, payload) tuples.
+    """
+    offset = 0
+    while offset + NLMSGHDR.size <= len(data):
+        length, msg_type, _, _, _ = NLMSGHDR.unpack_from(data, offset)
+        if length < NLMSGHDR.size:
+            break
+        yield msg_type, data[offset + NLMSGHDR.size:offset + length]
+        offset += _align(length)
+
+
+def _attributes(data: bytes, offset: int) -> dict:
+    """
+    Parse the rtattr list starting at offset.
+    :return: dictionary attribute type -> raw value
+    """
+    attributes = {}
+    while offset + RTATTR.size <= len(data):
+        length, attr_type = RTATTR.unpack_from(data, offset)
+        if length < RTATTR.size:
+            break
+        attributes[attr_type] = data[offset + RTATTR.size:offset + length]
+        offset += _align(length)
+    return attributes
+
+
+def _interface_index(interface: str) -> int:
+    try:
+        return socket.if_nametoindex(interface)
+    except OSError:
+        # interface is (currently) missing, e.g. a ppp link which is down
+        return None
+
+
+def interface_addresses(interface: str, family: int = socket.AF_UNSPEC) -> list:
+    """
+    List the addresses of a network interface.
+    :param interface: interface name like eth0
+    :param family: socket.AF_INET, socket.AF_INET6 or socket.AF_UNSPEC for both
+    :return: list of (address, flags, scope) tuples
+    """
+    index = _interface_index(interface)
+    if index is None:
+        return []
+
+    request = NLMSGHDR.pack(NLMSGHDR.size + IFADDRMSG.size, RTM_GETADDR, NLM_F_REQUEST | NLM_F_DUMP, 1, 0) \
+        + IFADDRMSG.pack(family, 0, 0, 0, 0)
+
+    addresses = []
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE) as sock:
+        sock.bind((0, 0))
+        sock.send(request)
+        while True:
+            for msg_type, payload in _messages(sock.recv(65536)):
+                if msg_type == NLMSG_DONE:
+                    return addresses
+                if msg_type == NLMSG_ERROR:
+                    raise OSError(f"netlink address dump failed for {interface}")
+                if msg_type != RTM_NEWADDR:
+                    continue
+                _, _, flags, scope, msg_index = IFADDRMSG.unpack_from(payload)
+                if msg_index != index:
+                    continue
+                attributes = _attributes(payload, IFADDRMSG.size)
+                # for point to point links IFA_ADDRESS is the peer, IFA_LOCAL the own address
+                raw = attributes.get(IFA_LOCAL, attributes.get(IFA_ADDRESS))
+                if raw is None:
+                    continue
+                if IFA_FLAGS in attributes:
+                    flags = struct.unpack("=I", attributes[IFA_FLAGS][:4])[0]
+                addresses.append((ip_address(raw), flags, scope))
+
+
+class NetlinkWatcher:
+    """
+    Waits for address, route or link changes of one network interface.
+    Bursts of events (e.g. a flapping link or a reconnect) are merged: wait() only returns once no further event
+    arrived for debounce seconds (or after debounce_max seconds at most).
+    """
+    GROUPS = RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE | RTMGRP_IPV6_IFADDR | RTMGRP_IPV6_ROUTE
+
+    def __init__(self, interface: str, debounce: float = 2.0, debounce_max: float = 30.0):
+        """
+        :param interface: interface name like eth0 or ppp0
+        :param debounce: seconds without events before a change is reported
+        :param debounce_max: report a change after this many seconds even if events keep coming
+        """
+        self.interface = interface
+        self.debounce = debounce
+        self.debounce_max = debounce_max
+        self._sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+        self._sock.bind((0, self.GROUPS))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._sock.close()
+
+    def _relevant(self, data: bytes) -> bool:
+        """
+        Check if a datagram contains a change of the watched interface.
+        """
+        index = _interface_index(self.interface)
+        for msg_type, payload in _messages(data):
+            if index is None and msg_type in (RTM_NEWLINK, RTM_DELLINK):
+                # the interface (re)appeared or vanished, can not tell by index
+                return True
+            if msg_type in (RTM_NEWADDR, RTM_DELADDR) and len(payload) >= IFADDRMSG.size:
+                if IFADDRMSG.unpack_from(payload)[4] == index:
+                    return True
+            elif msg_type in (RTM_NEWLINK, RTM_DELLINK) and len(payload) >= IFINFOMSG.size:
+                if IFINFOMSG.unpack_from(payload)[2] == index:
+                    return True
+            elif msg_type in (RTM_NEWROUTE, RTM_DELROUTE) and len(payload) >= RTMSG.size:
+                oif = _attributes(payload, RTMSG.size).get(RTA_OIF)
+                if oif is not None and struct.unpack("=I", oif[:4])[0] == index:
+                    return True
+        return False
+
+    def _read(self, timeout: float) -> bool:
+        """
+        Read events for up to timeout seconds.
+        :return: True if a relevant event arrived
+        """
+        end = time.monotonic() + timeout
+        while True:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return False
+            readable, _, _ = select.select([self._sock], [], [], remaining)
+            if not readable:
+                return False
+            if self._relevant(self._sock.recv(65536)):
+                return True
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Block until the interface changed (debounced) or timeout passed.
+        Socket errors count as a change without debouncing: ENOBUFS means a burst of events overflowed the buffer and
+        some were lost, after other errors the timeout is waited out first, so a broken socket degrades to polling.
+        :param timeout: seconds to wait for the first event
+        :return: True if the interface changed (or changes may have been missed), False on timeout
+        """
+        end = time.monotonic() + timeout
+        try:
+            if not self._read(timeout):
+                return False
+
+            start = time.monotonic()
+            while time.monotonic() - start < self.debounce_max and self._read(self.debounce):
+                pass
+        except OSError as e:
+            if e.errno == errno.ENOBUFS:
+                logging.warning(f"netlink events of {self.interface} were lost, syncing anyway")
+            else:
+                logging.error(f"watching {self.interface} failed: {e}")
+                time.sleep(max(0.0, end - time.monotonic()))
+            return True
+
+        logging.debug(f"network change on {self.interface}")
+        return True
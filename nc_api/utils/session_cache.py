@@ -0,0 +1,66 @@
+"""
+Keeps the api session id between runs, so not every run has to login and logout.
+"""
+
+import json
+import logging
+import os
+import time
+
+
+class SessionCache:
+    """
+    Json file containing the api session id, the customer it belongs to and when it was created.
+    The file is only readable by the owner, the session id grants access to the api.
+    """
+    # netcup ends api sessions after 15 minutes, stay a bit below
+    LIFETIME = 14 * 60
+
+    def __init__(self, filename: str, lifetime: int = LIFETIME):
+        self.filename = filename
+        self.lifetime = lifetime
+
+    def load(self, customer_id: str) -> (str, float):
+        """
+        Return the cached session id if it belongs to the customer and did not expire yet.
+        :param customer_id: netcup customer number
+        :return: (session id, login timestamp) or (None, None)
+        """
+        try:
+            with open(self.filename) as fp:
+                entry = json.load(fp)
+            if entry["customer_id"] == customer_id and time.time() - entry["created"] < self.lifetime:
+                logging.debug(f"reusing cached api session")
+                return entry["apisessionid"], entry["created"]
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError):
+            logging.warning(f"ignoring invalid session cache {self.filename}")
+
+        return None, None
+
+    def save(self, customer_id: str, session_id: str, created: float = None):
+        """
+        Store the session id, the file is created with mode 0600.
+        :param customer_id: netcup customer number
+        :param session_id: api session id
+        :param created: login timestamp, defaults to now
+        :return: None
+        """
+        tmp = f"{self.filename}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as fp:
+            json.dump({"customer_id": customer_id,
+                       "apisessionid": session_id,
+                       "created": time.time() if created is None else created}, fp)
+        os.replace(tmp, self.filename)
+
+    def clear(self):
+        """
+        Forget the cached session.
+        :return: None
+        """
+        try:
+            os.remove(self.filename)
+        except FileNotFoundError:
+            pass
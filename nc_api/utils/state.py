@@ -0,0 +1,57 @@
+"""
+Helper to remember what was published last time.
+"""
+
+import json
+import logging
+import os
+import time
+
+
+class PublishState:
+    """
+    Small json file containing the last successfully published ip and the digest of the config it was published with.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+
+    def load(self) -> dict:
+        """
+        Read the state file.
+        :return: state dictionary, empty if there is no (valid) state file
+        """
+        try:
+            with open(self.filename) as fp:
+                state = json.load(fp)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            logging.warning(f"ignoring invalid state file {self.filename}")
+            return {}
+
+        return state if isinstance(state, dict) else {}
+
+    def is_current(self, ip, digest: str) -> bool:
+        """
+        Check if ip and config were already published.
+        :param ip: external ip
+        :param digest: config digest
+        :return: True if nothing changed since the last publish
+        """
+        state = self.load()
+        return state.get("ip") == str(ip) and state.get("digest") == digest
+
+    def save(self, ip, digest: str):
+        """
+        Remember ip and config digest as published.
+        The file is replaced atomically, so an interrupted run never leaves a broken state behind.
+        :param ip: external ip
+        :param digest: config digest
+        :return: None
+        """
+        tmp = f"{self.filename}.tmp"
+        with open(tmp, "w") as fp:
+            json.dump({"ip": str(ip), "digest": digest, "time": time.time()}, fp)
+        os.replace(tmp, self.filename)
+        logging.debug(f"saved publish state to {self.filename}")
@@ -0,0 +1,97 @@
+"""
+Wall time instrumentation, emitted as json lines (one object per phase or http request).
+"""
+
+import json
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# the nc_api payload starts with the action, no need to decode whole record sets
+ACTION = re.compile(rb'^\{\s*"action"\s*:\s*"(\w+)"')
+
+
+class Timings:
+    """
+    Records phases (see phase()) and http requests of sessions attached via attach().
+    Without a stream nothing is recorded, so it can be passed around unconditionally.
+    """
+
+    def __init__(self, stream=None):
+        """
+        :param stream: text file like object to write json lines to, or None to disable
+        """
+        self._stream = stream
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, filename: str) -> "Timings":
+        """
+        :param filename: file to append to, "-" for stderr
+        :return: Timings
+        """
+        return cls(sys.stderr if filename == "-" else open(filename, "a"))
+
+    @property
+    def enabled(self) -> bool:
+        return self._stream is not None
+
+    def emit(self, **record):
+        """
+        Write one json line.
+        :param record: fields of the record
+        :return: None
+        """
+        if self._stream is None:
+            return
+        line = json.dumps({"ts": round(time.time(), 6), **record})
+        with self._lock:
+            self._stream.write(line + "\n")
+            self._stream.flush()
+
+    @contextmanager
+    def phase(self, name: str, **fields):
+        """
+        Contextmanager measuring the wall time of its block.
+        :param name: phase name
+        :param fields: additional fields, e.g. zone
+        """
+        if self._stream is None:
+            yield
+            return
+
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.emit(event="phase", phase=name, seconds=round(time.perf_counter() - start, 6), error=error, **fields)
+
+    def attach(self, session):
+        """
+        Record every request of a requests session.
+        :param session: requests.Session
+        :return: None
+        """
+        if self._stream is not None:
+            session.hooks["response"].append(self._on_response)
+
+    def _on_response(self, r, *args, **kwargs):
+        body = r.request.body or b""
+        if isinstance(body, str):
+            body = body.encode()
+        match = ACTION.match(body[:128])
+        # reading the content of a streamed response here would buffer it, only its length header is known
+        received = r.headers.get("Content-Length") if kwargs.get("stream") else len(r.content)
+        self.emit(event="http", method=r.request.method, url=r.url.split("?")[0], status=r.status_code,
+                  action=match.group(1).decode() if match else None, seconds=r.elapsed.total_seconds(),
+                  bytes_sent=len(body), bytes_received=int(received) if received is not None else None)
+
+    def close(self):
+        if self._stream is not None and self._stream is not sys.stderr:
+            self._stream.close()
@@ -0,0 +1,80 @@
+"""
+On disk cache for dns record sets, keyed by domain name and zone serial.
+"""
+
+import json
+import logging
+import os
+import threading
+
+from ..dns import DNSRecord, DNSRecordSet
+
+
+class ZoneCache:
+    """
+    Keeps the last fetched DNSRecordSet of every domain in a directory (one json file per domain).
+    A cached set is only returned if the zone serial still matches, netcup increases the serial on every change.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        # zones may be synced from several threads
+        self._lock = threading.Lock()
+
+    def _path(self, domainname: str) -> str:
+        return os.path.join(self.directory, f"{domainname}.json")
+
+    def get(self, domainname: str, serial: str, record_class=DNSRecord) -> DNSRecordSet:
+        """
+        Return the cached records of the domain if they belong to given serial.
+        :param domainname: domain name like netcup.de
+        :param serial: current zone serial
+        :param record_class: DNSRecord or CompactDNSRecord
+        :return: DNSRecordSet or None if there is no valid entry
+        """
+        try:
+            with open(self._path(domainname)) as fp:
+                entry = json.load(fp)
+            if entry["serial"] == serial:
+                rset = DNSRecordSet(dnsrecords=[record_class(**r) for r in entry["dnsrecordset"]["dnsrecords"]])
+                with self._lock:
+                    self.hits += 1
+                logging.debug(f"zone cache hit for {domainname} (serial {serial})")
+                return rset
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError):
+            logging.warning(f"ignoring invalid zone cache entry for {domainname}")
+
+        with self._lock:
+            self.misses += 1
+        logging.debug(f"zone cache miss for {domainname} (serial {serial})")
+        return None
+
+    def put(self, domainname: str, serial: str, recordset: DNSRecordSet):
+        """
+        Store the records of the domain for given serial.
+        :param domainname: domain name like netcup.de
+        :param serial: zone serial the records were read with
+        :param recordset: DNSRecordSet
+        :return: None
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(domainname)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as fp:
+            json.dump({"serial": serial, "dnsrecordset": recordset.json()}, fp)
+        os.replace(tmp, path)
+
+    def invalidate(self, domainname: str):
+        """
+        Drop the entry of the domain.
+        :param domainname: domain name like netcup.de
+        :return: None
+        """
+        try:
+            os.remove(self._path(domainname))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,61 @@
+"""
+Shared fixtures: the fake netcup api (see benchmarks/fake_netcup.py) and a fixed external ip source.
+"""
+
+import pytest
+
+from benchmarks.fake_netcup import FakeNetcup, serve
+from nc_api.utils.external_ip import ExternalIP
+
+DOMAIN = "example.com"
+
+
+def live_record(id_: int, hostname: str, type_: str, destination: str, priority: str = "0") -> dict:
+    """
+    A record as returned by infoDnsRecords.
+    """
+    return {"id": str(id_), "hostname": hostname, "type": type_, "priority": priority, "destination": destination,
+            "deleterecord": False, "state": "yes"}
+
+
+class FixedIP(ExternalIP):
+    """
+    Source always reporting the same address (None for a failing source).
+    """
+
+    def __init__(self, ip, version: int = 4, name: str = None):
+        self._ip = ip
+        self.version = version
+        self.name = name if name is not None else str(ip)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name}, ipv{self.version})"
+
+    @property
+    def ip(self):
+        return self._ip
+
+
+@pytest.fixture
+def zone_records() -> list:
+    """
+    Records of DOMAIN in the fake api, override this fixture in a test module to change them.
+    """
+    return []
+
+
+@pytest.fixture
+def netcup(zone_records):
+    """
+    Fake api serving DOMAIN with zone_records.
+    :return: (FakeNetcup, settings dictionary pointing to it)
+    """
+    api = FakeNetcup(api_password="password")
+    api.add_zone(DOMAIN, 0)
+    api.zones[DOMAIN]["records"] = zone_records
+    server = serve(api)
+    host, port = server.server_address
+    yield api, {"API_URL": f"http://{host}:{port}/", "API_KEY": "key", "API_PASSWORD": "password",
+                "CUSTOMER_ID": "1"}
+    server.shutdown()
+    server.server_close()
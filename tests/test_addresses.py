@@ -0,0 +1,28 @@
+"""
+A failing address family must not block the update of the other one.
+"""
+
+from ipaddress import IPv4Address, IPv6Address
+
+import dyndns
+from .conftest import FixedIP
+
+IP = IPv4Address("192.0.2.1")
+IP6 = IPv6Address("2001:db8::1")
+
+
+def test_both_families():
+    assert tuple(dyndns.get_addresses((FixedIP(IP), FixedIP(IP6, version=6)))) == (IP, IP6)
+
+
+def test_failed_ipv6_keeps_ipv4():
+    assert tuple(dyndns.get_addresses((FixedIP(IP), FixedIP(None, version=6)))) == (IP, None)
+
+
+def test_failed_ipv4_keeps_ipv6():
+    assert tuple(dyndns.get_addresses((FixedIP(None), FixedIP(IP6, version=6)))) == (None, IP6)
+
+
+def test_all_configured_families_failed():
+    assert dyndns.get_addresses((FixedIP(None), FixedIP(None, version=6))) is None
+    assert dyndns.get_addresses((FixedIP(None), None)) is None
@@ -0,0 +1,75 @@
+"""
+dyndns apply deletes every record missing in the zone file, so a host which can not be built must never be dropped.
+"""
+
+import json
+from ipaddress import IPv4Address, IPv6Address
+
+import pytest
+
+import dyndns
+from benchmarks.fake_netcup import FakeNetcup
+from nc_api.dns import DNSRecord, DNSRecordSet, diff_records
+from nc_api.exceptions import AddressUnknown
+from nc_api.utils.config import Host, parse_hosts
+from nc_api.utils.external_ip import Addresses
+from .conftest import DOMAIN, live_record
+
+IP = IPv4Address("192.0.2.1")
+IP6 = IPv6Address("2001:db8::1")
+
+
+@pytest.fixture
+def zone_records() -> list:
+    return [live_record(1, "@", "A", "192.0.2.9"), live_record(2, "@", "AAAA", str(IP6)),
+            live_record(3, "www", "CNAME", "example.com")]
+
+
+def zone_file(hosts: list) -> bytes:
+    return json.dumps({"zone": {"domainname": DOMAIN}, "hosts": hosts}).encode()
+
+
+def live(api: FakeNetcup) -> set:
+    return {(r["hostname"], r["type"], r["destination"]) for r in api.zones[DOMAIN]["records"]}
+
+
+def test_build_recordset_skips_missing_family():
+    hosts = [Host(hostname="@", type="A"), Host(hostname="@", type="AAAA")]
+    records = dyndns.build_recordset(hosts=hosts, ip=IP, ip6=None)
+    assert [(r.hostname, r.type) for r in records] == [("@", "A")]
+
+
+def test_build_recordset_strict_raises_for_missing_family():
+    hosts = [Host(hostname="@", type="A"), Host(hostname="@", type="AAAA")]
+    with pytest.raises(AddressUnknown):
+        dyndns.build_recordset(hosts=hosts, ip=IP, ip6=None, strict=True)
+
+
+def test_full_diff_deletes_unlisted_records():
+    live_set = DNSRecordSet([DNSRecord(hostname="@", type="A", destination="192.0.2.9", id=1),
+                             DNSRecord(hostname="old", type="A", destination="192.0.2.8", id=2)])
+    desired = DNSRecordSet([DNSRecord(hostname="@", type="A", destination=str(IP))])
+    diff = diff_records(live_set, desired, full=True)
+    assert [(old.id, new.destination) for old, new in diff.modified] == [(1, str(IP))]
+    assert [r.id for r in diff.deleted] == [2]
+    assert [r.hostname for r in diff_records(live_set, desired, full=False).deleted] == []
+
+
+def test_apply_without_ipv6_keeps_the_zone(netcup, monkeypatch):
+    api, settings = netcup
+    monkeypatch.setattr(dyndns, "get_addresses", lambda resolvers: Addresses(ipv4=IP))
+    config = parse_hosts(zone_file([{"hostname": "@", "type": "A"}, {"hostname": "@", "type": "AAAA"},
+                                    {"hostname": "www", "type": "CNAME", "destination": "example.com"}]))
+    before = live(api)
+
+    assert not dyndns.run_apply(settings=settings, config=config, jobs=1, output="none")
+    assert live(api) == before
+
+
+def test_apply_with_all_addresses(netcup, monkeypatch):
+    api, settings = netcup
+    monkeypatch.setattr(dyndns, "get_addresses", lambda resolvers: Addresses(ipv4=IP, ipv6=IP6))
+    config = parse_hosts(zone_file([{"hostname": "@", "type": "A"}, {"hostname": "@", "type": "AAAA"}]))
+
+    assert dyndns.run_apply(settings=settings, config=config, jobs=1, output="none")
+    assert live(api) == {("@", "A", str(IP)), ("@", "AAAA", str(IP6))}
@@ -0,0 +1,87 @@
+"""
+AsyncNcAPI against the fake netcup api.
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from aiohttp import ClientConnectionError
+
+from nc_api import DNSRecord, DNSRecordSet
+from nc_api.async_nc_api import AsyncNcAPI
+from nc_api.exceptions import APIException
+from .conftest import DOMAIN, live_record
+
+
+class RecordingNcAPI(AsyncNcAPI):
+    """
+    Remembers the aiohttp session it created.
+    """
+    created = None
+
+    @property
+    def session(self):
+        self.created = AsyncNcAPI.session.fget(self)
+        return self.created
+
+
+@pytest.fixture
+def zone_records() -> list:
+    return [live_record(1, "@", "A", "192.0.2.9"), live_record(2, "www", "CNAME", "example.com")]
+
+
+def client(settings: dict, **kwargs) -> RecordingNcAPI:
+    kwargs = dict(api_url=settings["API_URL"], api_key=settings["API_KEY"], api_password=settings["API_PASSWORD"],
+                  customer_id=settings["CUSTOMER_ID"], **kwargs)
+    return RecordingNcAPI(**kwargs)
+
+
+def test_info_and_update(netcup):
+    api, settings = netcup
+
+    async def main():
+        nc = client(settings)
+        async with nc:
+            assert len(api.sessions) == 1
+            zone = await nc.infoDnsZone(domainname=DOMAIN)
+            records = await nc.infoDnsRecords(domainname=DOMAIN)
+            assert [(r.hostname, r.type, r.destination) for r in records] == [("@", "A", "192.0.2.9"),
+                                                                               ("www", "CNAME", "example.com")]
+
+            zone.ttl = 300
+            await nc.updateDnsZone(zone)
+            changed = records.get("@", "A")
+            changed.destination = "192.0.2.1"
+            await nc.updateDnsRecords(zone, DNSRecordSet([changed, DNSRecord(hostname="new", type="TXT",
+                                                                             destination="hello")]))
+            assert {(r.hostname, r.destination) for r in await nc.infoDnsRecords(domainname=DOMAIN)} == {
+                ("@", "192.0.2.1"), ("www", "example.com"), ("new", "hello")}
+        return nc
+
+    nc = asyncio.run(main())
+    assert api.zones[DOMAIN]["zone"]["ttl"] == "300"
+    assert not api.sessions
+    assert nc.created.closed
+
+
+@pytest.mark.parametrize("failure", ["password", "connection"])
+def test_failed_login_closes_the_session(netcup, failure):
+    api, settings = netcup
+    if failure == "password":
+        settings, error = dict(settings, API_PASSWORD="wrong"), APIException
+    else:
+        settings, error = dict(settings, API_URL="http://127.0.0.1:1/"), ClientConnectionError
+
+    async def main():
+        nc = client(settings)
+        with pytest.raises(error):
+            async with nc:
+                pass
+        return nc
+
+    nc = asyncio.run(main())
+    assert nc.created is not None and nc.created.closed
+    assert nc._session is None
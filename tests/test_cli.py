@@ -0,0 +1,29 @@
+"""
+Command line checks, done before anything is read or sent.
+"""
+
+import pytest
+from click.testing import CliRunner
+
+import dyndns
+
+
+@pytest.fixture
+def files(tmp_path):
+    conf, hosts = tmp_path / "settings.json", tmp_path / "hosts.json"
+    conf.write_text("{}")
+    hosts.write_text('{"zone": {"domainname": "example.com"}, "hosts": []}')
+    return [str(conf), str(hosts)]
+
+
+@pytest.mark.parametrize("options, error", [
+    (["--watch", "eth0"], "--watch only works with --daemon"),
+    (["--debounce", "1"], "--debounce only works with --daemon"),
+    (["--metrics-port", "9100"], "--metrics-port only works with --daemon"),
+    (["--daemon", "--profile", "dyndns.prof"], "--profile only works without --daemon"),
+    (["--daemon", "--debounce", "1"], "--debounce only works with --watch"),
+])
+def test_invalid_option_combinations(files, options, error):
+    result = CliRunner().invoke(dyndns.dyndns, ["sync", *options, *files])
+    assert result.exit_code == 2
+    assert error in result.output
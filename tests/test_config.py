@@ -0,0 +1,70 @@
+"""
+The hosts file is validated before anything is sent.
+"""
+
+import json
+import re
+
+import pytest
+
+from dyndns import check_sources
+from nc_api.exceptions import ConfigError
+from nc_api.utils.config import Host, parse_hosts
+
+
+def hosts_file(*hosts) -> bytes:
+    return json.dumps({"zone": {"domainname": "example.com"}, "hosts": list(hosts)}).encode()
+
+
+def test_single_zone():
+    config = parse_hosts(hosts_file({"hostname": "@", "type": "A"},
+                                    {"hostname": "@", "type": "MX", "destination": "mx.example.com", "priority": "10"}))
+    assert [z.domainname for z in config.zones] == ["example.com"]
+    assert config.zones[0].hosts == [Host(hostname="@", type="A"),
+                                     Host(hostname="@", type="MX", destination="mx.example.com", priority=10)]
+    assert config.needs_ip
+    assert config.digest(ttl=300) != config.digest(ttl=None)
+
+
+def test_zones():
+    content = json.dumps({"zones": [{"domainname": "example.com", "hosts": []},
+                                    {"domainname": "example.org", "hosts": [{"hostname": "www", "type": "A"}]}]})
+    assert [len(z.hosts) for z in parse_hosts(content.encode()).zones] == [0, 1]
+
+
+@pytest.mark.parametrize("host, error", [
+    ({"hostname": "@", "type": "CNAM", "destination": "x"}, "zone.hosts[0].type: unknown record type 'CNAM'"),
+    ({"hostname": "a b", "type": "A"}, "zone.hosts[0].hostname: invalid hostname"),
+    ({"hostname": "@", "type": "A", "destination": "300.0.0.1"}, "zone.hosts[0].destination: '300.0.0.1' is no ipv4"),
+    ({"hostname": "@", "type": "AAAA", "destination": "192.0.2.1"}, "is no ipv6 address"),
+    ({"hostname": "@", "type": "CNAME"}, "zone.hosts[0].destination: required for CNAME records"),
+    ({"hostname": "@", "type": "MX", "destination": "mx", "priority": -1}, "zone.hosts[0].priority"),
+    ({"hostname": "@", "type": "A", "ttl": 60}, "zone.hosts[0].ttl: unknown key"),
+    ({"type": "A"}, "zone.hosts[0]: 'hostname' is missing"),
+])
+def test_invalid_host(host, error):
+    with pytest.raises(ConfigError, match=re.escape(error)):
+        parse_hosts(hosts_file(host), source="hosts.json")
+
+
+def test_syntax_error_has_position():
+    with pytest.raises(ConfigError, match=r"hosts.json:1:\d+: "):
+        parse_hosts(b'{"zone": ', source="hosts.json")
+
+
+def test_duplicate_zone():
+    content = json.dumps({"zones": [{"domainname": "example.com", "hosts": []}] * 2}).encode()
+    with pytest.raises(ConfigError, match="listed twice"):
+        parse_hosts(content)
+
+
+def test_address_sources():
+    config = parse_hosts(hosts_file({"hostname": "@", "type": "A"}, {"hostname": "@", "type": "AAAA"}))
+    with pytest.raises(ConfigError, match="no ipv6 source is configured"):
+        check_sources(config, {}, source="hosts.json")
+    with pytest.raises(ConfigError, match="no ipv4 source is configured"):
+        check_sources(config, {"IP_SOURCES": [], "IP6_SOURCES": ["ipify"]}, source="hosts.json")
+    check_sources(config, {"IP6_SOURCES": ["ipify"]}, source="hosts.json")
+
+    static = parse_hosts(hosts_file({"hostname": "@", "type": "AAAA", "destination": "2001:db8::1"}))
+    check_sources(static, {}, source="hosts.json")
@@ -0,0 +1,130 @@
+"""
+diff_records decides what is sent to updateDnsRecords, and with full (apply) what is deleted.
+"""
+
+import pytest
+
+from nc_api.dns import DNSRecord, DNSRecordSet, RecordSetDiff, diff_records
+from nc_api.exceptions import RecordUnknown
+
+
+def record(hostname: str, type_: str, destination: str, id_: int = None, priority: int = 0, **kwargs) -> DNSRecord:
+    return DNSRecord(hostname=hostname, type=type_, destination=destination, id=id_, priority=priority, **kwargs)
+
+
+LIVE = DNSRecordSet([record("@", "A", "192.0.2.1", 1),
+                     record("www", "CNAME", "example.com", 2),
+                     record("@", "MX", "mx.example.com", 3, priority=10),
+                     record("mail", "A", "192.0.2.5", 4)])
+
+
+def changes(diff: RecordSetDiff) -> dict:
+    summary = diff.summary()
+    return {k: sorted(map(tuple, v)) if isinstance(v, list) else v for k, v in summary.items()}
+
+
+def test_nothing_to_do():
+    desired = DNSRecordSet([record("@", "A", "192.0.2.1")])
+    diff = diff_records(LIVE, desired)
+    assert not diff.changed
+    assert [r.id for r in diff.unchanged] == [1]
+    assert list(diff.changes()) == []
+
+
+def test_modify_destination_keeps_id():
+    diff = diff_records(LIVE, DNSRecordSet([record("@", "A", "192.0.2.9")]))
+    assert [(old.id, new.id, new.destination) for old, new in diff.modified] == [(1, 1, "192.0.2.9")]
+    assert not diff.created and not diff.deleted
+
+
+def test_create():
+    diff = diff_records(LIVE, DNSRecordSet([record("new", "AAAA", "2001:db8::1")]))
+    assert changes(diff)["created"] == [("new", "AAAA", "2001:db8::1")]
+    assert [r.id for r in diff.changes()] == [None]
+
+
+def test_cname_is_replaced_by_other_type():
+    diff = diff_records(LIVE, DNSRecordSet([record("www", "A", "192.0.2.1")]))
+    assert [(old.type, new.type, new.id) for old, new in diff.modified] == [("CNAME", "A", 2)]
+
+
+def test_deleterecord():
+    diff = diff_records(LIVE, DNSRecordSet([record("mail", "A", "192.0.2.5", deleterecord=True),
+                                            record("gone", "A", "192.0.2.6", deleterecord=True)]))
+    assert [r.id for r in diff.deleted] == [4]
+    assert [(r.id, r.deleterecord) for r in diff.changes()] == [(4, True)]
+
+
+def test_partial_keeps_unlisted_records():
+    diff = diff_records(LIVE, DNSRecordSet([record("@", "A", "192.0.2.1"),
+                                            record("@", "MX", "mx.example.com", priority=20)]))
+    assert not diff.changed
+
+
+def test_full_compares_priorities_and_deletes_unlisted():
+    desired = DNSRecordSet([record("@", "A", "192.0.2.1"), record("@", "MX", "mx.example.com", priority=20),
+                            record("www", "CNAME", "example.com")])
+    diff = diff_records(LIVE, desired, full=True)
+    assert [(old.priority, new.priority, new.id) for old, new in diff.modified] == [(10, 20, 3)]
+    assert [r.id for r in diff.deleted] == [4]
+    assert len(diff.unchanged) == 2
+
+
+def test_full_with_empty_zone_file_deletes_everything():
+    diff = diff_records(LIVE, DNSRecordSet([]), full=True)
+    assert sorted(r.id for r in diff.deleted) == [1, 2, 3, 4]
+
+
+def test_live_records_may_be_an_iterator():
+    desired = DNSRecordSet([record("@", "A", "192.0.2.9")])
+    expected = changes(diff_records(LIVE, desired, full=True))
+    assert changes(diff_records(iter(list(LIVE)), desired, full=True)) == expected
+
+
+def test_json_round_trip():
+    desired = DNSRecordSet([record("@", "A", "192.0.2.9"), record("new", "TXT", "hello")])
+    diff = diff_records(LIVE, desired, full=True)
+    restored = RecordSetDiff.from_json(diff.json())
+    assert changes(restored) == dict(changes(diff), unchanged=0)
+    assert diff.json()["unchanged"] == len(diff.unchanged)
+    assert list(restored.changes()) == list(diff.changes())
+
+
+def test_index_follows_add_modify_remove_reindex():
+    rset = DNSRecordSet([record("@", "A", "192.0.2.1", 1)])
+    www = record("www", "CNAME", "example.com", 2)
+
+    rset.add(www)
+    assert rset.get_by_hostname("www") is www
+    assert rset.get("www", "CNAME") is www
+    assert "www" in rset and ("www", "CNAME") in rset and ("www", "A") not in rset
+
+    rset.modify(www, hostname="web", type="A", destination="192.0.2.2")
+    assert rset.get("web", "A") is www
+    assert "www" not in rset and ("web", "A") in rset and ("web", "CNAME") not in rset
+    with pytest.raises(RecordUnknown):
+        rset.get_by_hostname("www")
+
+    rset.remove(www)
+    assert "web" not in rset and len(rset) == 1
+    with pytest.raises(RecordUnknown):
+        rset.get("web", "A")
+
+    # changed behind the set's back, only visible after reindex
+    rset.dnsrecords.append(record("mail", "MX", "mx.example.com", 3))
+    rset.dnsrecords[0].hostname = "root"
+    assert "mail" not in rset and "@" in rset
+    rset.reindex()
+    assert rset.get("mail", "MX").id == 3
+    assert rset.get_by_hostname("root").id == 1
+    assert "@" not in rset
+
+
+def test_index_is_built_on_first_lookup():
+    rset = DNSRecordSet([record("@", "A", "192.0.2.1", 1)])
+    rset.add(record("www", "A", "192.0.2.2", 2))
+    rset.modify(rset.dnsrecords[0], hostname="root")
+    assert rset._by_hostname is None
+
+    assert rset.get("www", "A").id == 2
+    assert "root" in rset and "@" not in rset
@@ -0,0 +1,22 @@
+"""
+Metric labels of ip lookups have to be stable between processes.
+"""
+
+from ipaddress import IPv4Address
+
+from nc_api.utils.external_ip import ExternalRace, find_addresses
+from nc_api.utils.metrics import REGISTRY
+from .conftest import FixedIP
+
+IP = IPv4Address("192.0.2.1")
+
+
+def test_race_observes_its_sources_only():
+    race = ExternalRace([FixedIP(IP, name="a.example"), FixedIP(IP, name="b.example")], quorum=2)
+    assert repr(race) == "ExternalRace(FixedIP(a.example, ipv4), FixedIP(b.example, ipv4), quorum=2)"
+
+    assert find_addresses(ipv4=race).ipv4 == IP
+    metrics = REGISTRY.render()
+    assert 'source="FixedIP(a.example, ipv4)"' in metrics
+    assert 'source="ExternalRace' not in metrics
+    assert " object at 0x" not in metrics
@@ -0,0 +1,39 @@
+"""
+Published changes are appended to the journal and can be queried by hostname, zone and time.
+"""
+
+from nc_api.dns import DNSRecord, DNSRecordSet, diff_records
+from nc_api.utils.journal import Journal
+
+
+def diff():
+    live = DNSRecordSet([DNSRecord(hostname="www", type="A", destination="192.0.2.1", id=1),
+                         DNSRecord(hostname="old", type="A", destination="192.0.2.2", id=2)])
+    desired = DNSRecordSet([DNSRecord(hostname="www", type="A", destination="192.0.2.9"),
+                            DNSRecord(hostname="new", type="TXT", destination="hello")])
+    return diff_records(live, desired, full=True)
+
+
+def test_record_and_history(tmp_path):
+    with Journal(str(tmp_path / "journal.sqlite")) as journal:
+        journal.record(zone="example.com", serial="1", diff=diff(), latency=0.5, when=100.0)
+        journal.record(zone="example.org", serial="7", diff=diff(), when=200.0)
+
+        changes = journal.history(zone="example.com")
+        assert sorted((c["hostname"], c["change"], c["old_destination"], c["new_destination"]) for c in changes) == [
+            ("new", "create", None, "hello"), ("old", "delete", "192.0.2.2", None),
+            ("www", "modify", "192.0.2.1", "192.0.2.9")]
+        assert {(c["serial"], c["latency"]) for c in changes} == {("1", 0.5)}
+
+        assert [c["zone"] for c in journal.history(hostname="www")] == ["example.org", "example.com"]
+        assert [c["time"] for c in journal.history(hostname="www", since=150.0)] == [200.0]
+        assert [c["time"] for c in journal.history(hostname="www", until=150.0)] == [100.0]
+        assert len(journal.history(limit=2)) == 2
+
+
+def test_journal_is_kept(tmp_path):
+    filename = str(tmp_path / "journal.sqlite")
+    with Journal(filename) as journal:
+        journal.record(zone="example.com", serial="1", diff=diff())
+    with Journal(filename) as journal:
+        assert len(journal.history()) == 3
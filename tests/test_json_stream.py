@@ -0,0 +1,57 @@
+"""
+The records array is parsed incrementally, whatever the chunk boundaries are.
+"""
+
+import json
+import random
+
+import pytest
+
+from nc_api.utils.json_stream import iter_array
+
+RECORDS = [{"id": str(i), "hostname": f"host{i}", "type": "TXT", "destination": f"café ✓ {{[\\\"{i}\\\"]}}"}
+           for i in range(200)]
+DOCUMENT = json.dumps({"status": "success", "statuscode": 2000,
+                       "responsedata": {"dnsrecords": RECORDS, "after": [1, 2]}}).encode()
+
+
+def chunked(data: bytes, sizes) -> list:
+    chunks, pos = [], 0
+    for size in sizes:
+        chunks.append(data[pos:pos + size])
+        pos += size
+        if pos >= len(data):
+            return chunks
+    return chunks + [data[pos:]]
+
+
+def fail(response):
+    raise AssertionError(f"unexpected fallback: {response}")
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 1 << 16])
+def test_fixed_chunk_sizes(size):
+    assert list(iter_array(chunked(DOCUMENT, [size] * len(DOCUMENT)), key="dnsrecords", fallback=fail)) == RECORDS
+
+
+def test_random_chunk_sizes():
+    rnd = random.Random(1)
+    for _ in range(20):
+        chunks = chunked(DOCUMENT, [rnd.randint(1, 50) for _ in range(len(DOCUMENT))])
+        assert list(iter_array(chunks, key="dnsrecords", fallback=fail)) == RECORDS
+
+
+def test_empty_array():
+    document = b'{"status": "success", "responsedata": {"dnsrecords": []}}'
+    assert list(iter_array(chunked(document, [5] * 20), key="dnsrecords", fallback=fail)) == []
+
+
+def test_error_response_uses_fallback():
+    document = json.dumps({"status": "error", "statuscode": 4001, "responsedata": ""}).encode()
+    assert list(iter_array(chunked(document, [3] * 40), key="dnsrecords",
+                           fallback=lambda response: [response["statuscode"]])) == [4001]
+
+
+def test_truncated_document():
+    with pytest.raises(ValueError):
+        list(iter_array([DOCUMENT[:len(DOCUMENT) // 2]], key="dnsrecords", fallback=fail))
@@ -0,0 +1,62 @@
+"""
+NcAPI against the fake netcup api: streamed records, session renewal and metrics.
+"""
+
+import pytest
+
+from benchmarks.fake_netcup import make_records
+from nc_api import NcAPI
+from nc_api.utils.metrics import API_ERRORS, API_LATENCY
+from nc_api.utils.session_cache import SessionCache
+from .conftest import DOMAIN
+
+
+def errors(message: str) -> float:
+    return API_ERRORS._values.get(API_ERRORS._key(dict(action="infoDnsRecords", message=message)), 0)
+
+
+@pytest.fixture
+def zone_records() -> list:
+    return make_records(500)
+
+
+def client(settings: dict, **kwargs) -> NcAPI:
+    return NcAPI(api_url=settings["API_URL"], api_key=settings["API_KEY"], api_password=settings["API_PASSWORD"],
+                 customer_id=settings["CUSTOMER_ID"], **kwargs)
+
+
+def test_iter_matches_info(netcup):
+    api, settings = netcup
+    with client(settings) as nc:
+        streamed = list(nc.iterDnsRecords(domainname=DOMAIN, chunk_size=100))
+        assert streamed == list(nc.infoDnsRecords(domainname=DOMAIN))
+    assert len(streamed) == 500
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_expired_session_is_renewed(netcup, tmp_path, stream):
+    api, settings = netcup
+    cache = SessionCache(str(tmp_path / "session.json"))
+    cache.save(customer_id="1", session_id="expired")
+
+    with client(settings, session_cache=cache) as nc:
+        if stream:
+            records = list(nc.iterDnsRecords(domainname=DOMAIN))
+        else:
+            records = list(nc.infoDnsRecords(domainname=DOMAIN))
+    assert len(records) == 500
+    assert cache.load(customer_id="1")[0] in api.sessions
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_errors_and_latency_are_recorded(netcup, stream):
+    api, settings = netcup
+    before = errors("Domain not found.")
+    with client(settings) as nc:
+        with pytest.raises(Exception, match="Domain not found"):
+            if stream:
+                list(nc.iterDnsRecords(domainname="unknown.example"))
+            else:
+                nc.infoDnsRecords(domainname="unknown.example")
+    assert errors("Domain not found.") == before + 1
+    assert "netcup_api_request_seconds_count{action=\"infoDnsRecords\"}" in API_LATENCY.render()
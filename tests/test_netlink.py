@@ -0,0 +1,54 @@
+"""
+Socket errors of the netlink watcher must not end the daemon, nor delay it beyond the poll interval.
+"""
+
+import errno
+import logging
+import socket
+import time
+
+from nc_api.utils.netlink import NetlinkWatcher
+
+
+class FailingSocket:
+    """
+    Always readable, every recv fails with the given errno.
+    """
+
+    def __init__(self, error: int):
+        self.error = error
+        self.reader, self.writer = socket.socketpair()
+        self.writer.send(b"x")
+
+    def fileno(self):
+        return self.reader.fileno()
+
+    def recv(self, size: int) -> bytes:
+        raise OSError(self.error, "failed")
+
+    def close(self):
+        self.reader.close()
+        self.writer.close()
+
+
+def watcher(error: int) -> NetlinkWatcher:
+    w = NetlinkWatcher.__new__(NetlinkWatcher)
+    w.interface, w.debounce, w.debounce_max = "ppp0", 0.2, 1.0
+    w._sock = FailingSocket(error)
+    return w
+
+
+def test_lost_events_count_as_change(caplog):
+    with watcher(errno.ENOBUFS) as w:
+        start = time.monotonic()
+        assert w.wait(timeout=5.0)
+    assert time.monotonic() - start < 0.1
+    assert len([r for r in caplog.records if r.levelno == logging.WARNING]) == 1
+
+
+def test_broken_socket_waits_out_the_timeout(caplog):
+    with watcher(errno.EIO) as w:
+        start = time.monotonic()
+        assert w.wait(timeout=0.3)
+    assert 0.3 <= time.monotonic() - start < 0.5
+    assert len([r for r in caplog.records if r.levelno == logging.ERROR]) == 1
@@ -0,0 +1,61 @@
+"""
+Plans are only applied to zones which did not change since they were made.
+"""
+
+import json
+from ipaddress import IPv4Address
+
+import pytest
+
+import dyndns
+from benchmarks.fake_netcup import FakeNetcup
+from nc_api.utils.config import parse_hosts
+from nc_api.utils.external_ip import Addresses
+from .conftest import DOMAIN, live_record
+
+IP = IPv4Address("192.0.2.1")
+
+
+@pytest.fixture
+def zone_records() -> list:
+    return [live_record(1, "@", "A", "192.0.2.9")]
+
+
+@pytest.fixture(autouse=True)
+def addresses(monkeypatch):
+    monkeypatch.setattr(dyndns, "get_addresses", lambda resolvers: Addresses(ipv4=IP))
+
+
+def make_plan(settings: dict, tmp_path) -> dict:
+    hosts = {"zone": {"domainname": DOMAIN}, "hosts": [{"hostname": "@", "type": "A"}]}
+    config = parse_hosts(json.dumps(hosts).encode())
+    zones = []
+    assert dyndns.run_apply(settings=settings, config=config, jobs=1, output="none", plan=zones)
+    filename = tmp_path / "plan.json"
+    dyndns.write_plan(str(filename), plan=zones, full=True)
+    assert [p.name for p in tmp_path.iterdir()] == ["plan.json"]
+    plan, config = dyndns.load_zonefile(str(filename))
+    assert config is None
+    return plan
+
+
+def destinations(api: FakeNetcup) -> list:
+    return [r["destination"] for r in api.zones[DOMAIN]["records"]]
+
+
+def test_apply_plan(netcup, tmp_path):
+    api, settings = netcup
+    plan = make_plan(settings, tmp_path)
+    assert destinations(api) == ["192.0.2.9"]
+
+    assert dyndns.run_apply_plan(settings=settings, plan=plan, jobs=1, output="none")
+    assert destinations(api) == [str(IP)]
+
+
+def test_outdated_plan_is_refused(netcup, tmp_path):
+    api, settings = netcup
+    plan = make_plan(settings, tmp_path)
+    api.zones[DOMAIN]["zone"]["serial"] = "2020010199"
+
+    assert not dyndns.run_apply_plan(settings=settings, plan=plan, jobs=1, output="none")
+    assert destinations(api) == ["192.0.2.9"]
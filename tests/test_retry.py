@@ -0,0 +1,95 @@
+"""
+Transient failures are retried, but never if repeating the request could create records twice.
+"""
+
+import pytest
+from requests import Response
+from requests.exceptions import ConnectionError, ConnectTimeout, HTTPError, ReadTimeout
+
+from nc_api import NcAPI
+
+OK = b'{"status": "success", "statuscode": 2000, "responsedata": ""}'
+
+
+def response(status: int) -> Response:
+    r = Response()
+    r.status_code, r._content, r.url = status, OK, "http://api.example/"
+    return r
+
+
+class ScriptedSession:
+    """
+    Fails with the given outcomes (exceptions or http status codes) before it answers successfully.
+    """
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.posts = 0
+
+    def post(self, **kwargs) -> Response:
+        self.posts += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else 200
+        if isinstance(outcome, Exception):
+            raise outcome
+        return response(outcome)
+
+
+def client(session: ScriptedSession) -> NcAPI:
+    api = NcAPI(api_url="http://api.example/", api_key="key", api_password="password", customer_id="1",
+                session=session, retries=3, backoff=0)
+    api._session_id = "session"
+    return api
+
+
+def update(api: NcAPI, *ids) -> dict:
+    records = [{"id": id_, "hostname": "@", "type": "A", "destination": "192.0.2.1"} for id_ in ids]
+    return api.nc_request(action="updateDnsRecords", parameters={"domainname": "example.com",
+                                                                 "dnsrecordset": {"dnsrecords": records}})
+
+
+@pytest.mark.parametrize("failure", [ConnectionError(), ReadTimeout(), 503, 429])
+def test_reading_is_retried(failure):
+    session = ScriptedSession(failure, failure)
+    api = client(session)
+    api._post(api.nc_request(action="infoDnsZone", parameters={"domainname": "example.com"}))
+    assert session.posts == 3
+
+
+def test_retries_are_limited():
+    session = ScriptedSession(*[ConnectionError()] * 10)
+    api = client(session)
+    with pytest.raises(ConnectionError):
+        api._post(api.nc_request(action="infoDnsZone", parameters={"domainname": "example.com"}))
+    assert session.posts == 4
+
+
+def test_updating_existing_records_is_retried():
+    session = ScriptedSession(ReadTimeout(), 502)
+    api = client(session)
+    api._post(update(api, "1", "2"))
+    assert session.posts == 3
+
+
+@pytest.mark.parametrize("failure, error", [(ReadTimeout(), ReadTimeout), (ConnectionError(), ConnectionError),
+                                            (503, HTTPError)])
+def test_creating_records_is_not_retried(failure, error):
+    session = ScriptedSession(failure)
+    api = client(session)
+    with pytest.raises(error):
+        api._post(update(api, "1", None))
+    assert session.posts == 1
+
+
+def test_creating_records_is_retried_without_connection():
+    session = ScriptedSession(ConnectTimeout())
+    api = client(session)
+    api._post(update(api, None))
+    assert session.posts == 2
+
+
+def test_client_errors_are_not_retried():
+    session = ScriptedSession(404)
+    api = client(session)
+    with pytest.raises(HTTPError):
+        api._post(api.nc_request(action="infoDnsZone", parameters={"domainname": "example.com"}))
+    assert session.posts == 1